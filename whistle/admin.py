@@ -37,7 +37,13 @@ class NotificationAdmin(admin.ModelAdmin):
     raw_id_fields = ('recipient', 'actor')
     form = NotificationAdminForm
 
+    def get_queryset(self, request):
+        return super().get_queryset(request)\
+            .prefetch_subjects()\
+            .prefetch_descriptions(pass_variables=(True,), urls=False)
+
     def make_unread(self, request, queryset):
+        recipient_ids = self.get_recipient_ids(queryset)
         rows_updated = queryset.update(is_read=False)
 
         message = ngettext(
@@ -48,11 +54,12 @@ class NotificationAdmin(admin.ModelAdmin):
             'count': rows_updated,
         }
 
-        self.clear_unread_notifications_cache(request, queryset)
+        self.clear_recipients_cache(request, recipient_ids)
         self.message_user(request, message)
     make_unread.short_description = _('Make unread')
 
     def make_read(self, request, queryset):
+        recipient_ids = self.get_recipient_ids(queryset)
         rows_updated = queryset.update(is_read=True)
 
         message = ngettext(
@@ -63,17 +70,22 @@ class NotificationAdmin(admin.ModelAdmin):
             'count': rows_updated,
         }
 
-        self.clear_unread_notifications_cache(request, queryset)
+        self.clear_recipients_cache(request, recipient_ids)
         self.message_user(request, message)
     make_read.short_description = _('Make read')
 
-    def clear_unread_notifications_cache(self, request, queryset):
-        recipients = get_user_model().objects.filter(pk__in=queryset.values_list('recipient', flat=True))
+    def get_recipient_ids(self, queryset):
+        return set(queryset.order_by().values_list('recipient', flat=True).distinct())
 
-        if recipients.exists():
-            for recipient in recipients:
-                recipient.clear_unread_notifications_cache()
+    def clear_recipients_cache(self, request, recipient_ids):
+        if recipient_ids:
+            user_model = get_user_model()
+            user_model.clear_unread_notifications_cache_many(recipient_ids)
+            user_model.reset_unread_notifications_counts(recipient_ids)
             self.message_user(request, _('Unread notifications cache cleared'))
+
+    def clear_unread_notifications_cache(self, request, queryset):
+        self.clear_recipients_cache(request, self.get_recipient_ids(queryset))
     clear_unread_notifications_cache.short_description = _('Clear unread notifications cache')
 
     def send_email(self, request, queryset):
@@ -87,7 +99,9 @@ class NotificationAdmin(admin.ModelAdmin):
 
     def resave_description(self, request, queryset):
         for notification in queryset:
-            print(notification.resave_description())
+            notification.resave_description()
+
+        self.message_user(request, _('Descriptions resaved'))
     resave_description.short_description = _('Resave description')
 
     def push(self, request, queryset):
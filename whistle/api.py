@@ -1,3 +1,4 @@
+from django.db.models.manager import BaseManager
 from django.utils.translation import ngettext
 
 from rest_framework import serializers, viewsets
@@ -6,6 +7,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from pragmatic.serializers import ContentTypeNaturalField
+from whistle.managers import prefetch_descriptions
 from whistle.models import Notification
 
 
@@ -26,6 +28,16 @@ class PushSerializer(serializers.ModelSerializer):
         pass
 
 
+class NotificationListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        notifications = data.all() if isinstance(data, BaseManager) else data
+
+        # resolve descriptions and URLs of whole page at once
+        prefetch_descriptions(list(notifications), urls=False)
+
+        return super().to_representation(notifications)
+
+
 class NotificationSerializer(serializers.ModelSerializer):
     description = serializers.CharField()
     short_description = serializers.CharField()
@@ -36,6 +48,7 @@ class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
         exclude = []
+        list_serializer_class = NotificationListSerializer
 
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
@@ -51,7 +64,8 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
                 'target_content_type',
                 'recipient',
                 'actor'
-            )
+            )\
+            .prefetch_subjects()
 
 
 class MarkNotificationsAsReadAPIView(APIView):
@@ -65,10 +79,15 @@ class MarkNotificationsAsReadAPIView(APIView):
         if notification_id:
             unread_notifications = unread_notifications.filter(id=notification_id)
 
-        num_notifications = unread_notifications.count()
-        unread_notifications.mark_as_read()
+        num_notifications = unread_notifications.mark_as_read()
         request.user.clear_unread_notifications_cache()
 
+        if notification_id:
+            request.user.decr_unread_notifications_count(num_notifications)
+        else:
+            # all notifications are read, including those not counted yet
+            request.user.set_unread_notifications_count(0)
+
         return Response(status=200, data=ngettext(
             '%(count)d notification marked as read',
             '%(count)d notifications marked as read',
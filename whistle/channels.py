@@ -0,0 +1,99 @@
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
+
+from whistle import settings as whistle_settings
+
+# {name: Channel}
+_channels = {}
+
+
+class Channel(object):
+    """
+    Delivery backend of a notification channel
+    """
+    name = None
+    label = None
+
+    # channel is delivered before all other channels (which may refer to its results)
+    dispatch_first = False
+
+    @property
+    def manager(self):
+        from whistle.settings import notification_manager
+        return notification_manager
+
+    def send(self, notification):
+        self.send_batch([notification])
+
+    def send_batch(self, notifications):
+        """
+        Delivers notifications, may return list of (notification, exception) failures to be retried separately
+        """
+        raise NotImplementedError
+
+    async def asend_batch(self, notifications):
+        await self.manager.run_in_thread(self.send_batch)(notifications)
+
+
+class WebChannel(Channel):
+    name = 'web'
+    label = _('Web')
+    dispatch_first = True
+
+    def send(self, notification):
+        self.manager.save_notification(notification)
+
+    def send_batch(self, notifications):
+        self.manager.save_notifications(notifications)
+
+    async def asend_batch(self, notifications):
+        await self.manager.asave_notifications(notifications)
+
+
+class EmailChannel(Channel):
+    name = 'email'
+    label = _('E-mail')
+
+    def send(self, notification):
+        if self.manager.is_digest_enabled(notification.recipient, notification.event):
+            # deliver later within email digest
+            self.manager.digest_notifications([notification])
+        else:
+            self.manager.notify_email(notification)
+
+    def send_batch(self, notifications):
+        return self.manager.email_notifications(notifications)
+
+    async def asend_batch(self, notifications):
+        await self.manager.aemail_notifications(notifications)
+
+
+class PushChannel(Channel):
+    name = 'push'
+    label = _('Push')
+
+    def send(self, notification):
+        self.manager.notify_push(notification)
+
+    def send_batch(self, notifications):
+        return self.manager.push_notifications(notifications)
+
+    async def asend_batch(self, notifications):
+        await self.manager.apush_notifications(notifications)
+
+
+def get_channel(name):
+    try:
+        return _channels[name]
+    except KeyError:
+        channel = _channels[name] = import_string(whistle_settings.CHANNEL_BACKENDS[name])()
+        return channel
+
+
+def get_channels():
+    """
+    Returns {name: Channel} of configured channels, dispatch first channels at first, otherwise in order
+    of WHISTLE_CHANNELS
+    """
+    channels = [(name, get_channel(name)) for name in whistle_settings.CHANNELS]
+    return dict(sorted(channels, key=lambda item: not item[1].dispatch_first))
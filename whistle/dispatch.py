@@ -0,0 +1,116 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.db import connections
+from django.utils import translation
+from django.utils.translation import get_language
+
+from whistle import settings as whistle_settings
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class ChannelDispatchError(Exception):
+    """
+    Errors of channels dispatched concurrently, keyed by channel
+    """
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(f'{channel}: {error!r}' for channel, error in errors.items()))
+
+
+def get_executor():
+    """
+    Returns process-wide thread pool shared by all channel dispatches
+    """
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=whistle_settings.CONCURRENT_CHANNELS_THREADS,
+                    thread_name_prefix='whistle'
+                )
+
+    return _executor
+
+
+def closing_connections(func):
+    """
+    Closes DB connections opened by func, connections are thread local and would leak in worker threads
+    """
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            connections.close_all()
+
+    return wrapper
+
+
+def keeping_language(func):
+    """
+    Runs func in active language of the caller, translations are thread local
+    """
+    language = get_language()
+
+    def wrapper(*args, **kwargs):
+        with translation.override(language):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def log_error(channel):
+    def callback(future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error('Failed to dispatch %s notifications', channel, exc_info=future.exception())
+
+    return callback
+
+
+def dispatch(tasks):
+    """
+    Runs channel tasks {channel: callable} concurrently on shared thread pool. Waits for each channel
+    at most its WHISTLE_CHANNEL_TIMEOUTS seconds, fire-and-forget channels are not waited for at all
+    (their errors are only logged). Errors of all other channels are raised together as ChannelDispatchError.
+    """
+    executor = get_executor()
+    started = time.monotonic()
+    futures = {}
+
+    for channel, task in tasks.items():
+        future = executor.submit(closing_connections(keeping_language(task)))
+
+        if channel in whistle_settings.FIRE_AND_FORGET_CHANNELS:
+            future.add_done_callback(log_error(channel))
+        else:
+            futures[channel] = future
+
+    errors = {}
+
+    for channel, future in futures.items():
+        timeout = whistle_settings.CHANNEL_TIMEOUTS.get(channel, None)
+
+        if timeout is not None:
+            # all channels run since submission, wait only for the rest of their time
+            timeout = max(timeout - (time.monotonic() - started), 0)
+
+        try:
+            future.result(timeout=timeout)
+        except TimeoutError as e:
+            # running task can't be interrupted, its late result is just ignored
+            future.add_done_callback(log_error(channel))
+            errors[channel] = e
+        except Exception as e:
+            errors[channel] = e
+
+    if errors:
+        raise ChannelDispatchError(errors)
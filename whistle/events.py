@@ -0,0 +1,46 @@
+from django.utils.translation import get_language
+
+from whistle import settings as whistle_settings
+from whistle.helpers import PLACEHOLDERS_PATTERN, strip_unwanted_chars, clean_description
+
+# {language: {event: CompiledEvent}}
+_compiled_events = {}
+
+
+class CompiledEvent(object):
+    """
+    Event description template compiled for active language
+    """
+    __slots__ = ('template', 'placeholders', 'label', 'short_description')
+
+    def __init__(self, template):
+        self.template = str(template)
+        self.placeholders = frozenset(PLACEHOLDERS_PATTERN.findall(self.template))
+        self.label = strip_unwanted_chars(template)
+        # placeholders are stripped instead of formatted, so short description doesn't depend on conversion types
+        self.short_description = self.label
+
+    def format(self, context):
+        return clean_description(self.template % context)
+
+
+def get_compiled_event(event):
+    """
+    Compiles event lazily, so a broken template fails only its own event
+    """
+    compiled_events = _compiled_events.setdefault(get_language(), {})
+
+    try:
+        return compiled_events[event]
+    except KeyError:
+        template = dict(whistle_settings.EVENTS).get(event)
+
+        if template is None:
+            return None
+
+        compiled_event = compiled_events[event] = CompiledEvent(template)
+        return compiled_event
+
+
+def get_compiled_events():
+    return {event: get_compiled_event(event) for event, template in whistle_settings.EVENTS}
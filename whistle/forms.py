@@ -1,3 +1,4 @@
+import json
 import re
 
 from django import forms
@@ -7,7 +8,8 @@ from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Div, HTML, Field, Layout, Submit
 
 from whistle import settings as whistle_settings
-from whistle.helpers import strip_unwanted_chars
+from whistle.channels import get_channel
+from whistle.events import get_compiled_events
 from whistle.models import Notification
 from whistle.settings import notification_manager
 
@@ -47,30 +49,27 @@ class NotificationSettingsForm(forms.Form):
 
     @property
     def labels(self):
-        events = dict(whistle_settings.EVENTS)
-
-        for event, label in events.items():
-            new_label = strip_unwanted_chars(label)
-            events[event] = new_label
-
-        return events
+        return {event: compiled_event.label for event, compiled_event in get_compiled_events().items()}
 
     def channel_labels(self, channel):
-        return {
-            'web': _('Web'),
-            'email': _('E-mail'),
-            'push': _('Push')
-        }.get(channel, channel)
+        return get_channel(channel).label or channel
 
     def field_names(self, event):
         event_identifier = event.lower()
 
         return {
-            'web': 'web_{}'.format(event_identifier),
-            'email': 'email_{}'.format(event_identifier),
-            'push': 'push_{}'.format(event_identifier)
+            channel: '{}_{}'.format(channel, event_identifier)
+            for channel in whistle_settings.CHANNELS
         }
 
+    def digest_field_name(self, event):
+        return 'digest_{}'.format(event.lower())
+
+    def is_digest_available(self, event):
+        # digests are delivered by email
+        return 'email' in whistle_settings.CHANNELS and \
+            notification_manager.is_notification_available(self.user, 'email', event)
+
     def get_initial_value(self, channel, event=None):
         return notification_manager.is_notification_enabled(self.user, channel, event, bypass_channel=True)
 
@@ -96,6 +95,14 @@ class NotificationSettingsForm(forms.Form):
                             initial=self.get_initial_value(channel, event)),
                     })
 
+            if self.is_digest_available(event):
+                self.fields.update({
+                    self.digest_field_name(event): forms.BooleanField(
+                        label=_('Digest'),
+                        required=False,
+                        initial=notification_manager.is_digest_enabled(self.user, event)),
+                })
+
     def init_form_helper(self):
         fields = []
         channel_fields = []
@@ -123,6 +130,11 @@ class NotificationSettingsForm(forms.Form):
                         Div(Field(field_names[channel], css_class='switch'), css_class='col-md')
                     )
 
+            if self.is_digest_available(event):
+                event_fields.append(
+                    Div(Field(self.digest_field_name(event), css_class='switch'), css_class='col-md')
+                )
+
             if len(event_fields) > 0:
                 fields.append(Div(
                         Div(HTML('<p>{}</p>'.format(label)), css_class='col-md-6'),
@@ -142,7 +154,13 @@ class NotificationSettingsForm(forms.Form):
         self.helper.layout = Layout(*fields)
 
     def clean(self):
-        settings = {'channels': {}, 'events': {}}
+        notification_settings = getattr(self.user, 'notification_settings', None) or {}
+
+        if isinstance(notification_settings, str):
+            notification_settings = json.loads(notification_settings)
+
+        # keep digest choices of events not shown in the form
+        settings = {'channels': {}, 'events': {}, 'digests': dict(notification_settings.get('digests', {}))}
 
         for channel in whistle_settings.CHANNELS:
             if notification_manager.is_channel_available(self.user, channel):
@@ -161,4 +179,7 @@ class NotificationSettingsForm(forms.Form):
 
                     settings['events'][channel][event_identifier] = self.cleaned_data.get(field_names[channel])
 
+            if self.is_digest_available(event):
+                settings['digests'][event_identifier] = self.cleaned_data.get(self.digest_field_name(event))
+
         return settings
@@ -1,4 +1,6 @@
 import re
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import QuerySet
 from django.utils.translation import gettext
 
 from whistle.settings import notification_manager
@@ -9,12 +11,85 @@ def notify(recipient, event, actor=None, object=None, target=None, details=''):
                                 details=details)
 
 
+def notify_many(recipients, event, actor=None, object=None, target=None, details=''):
+    return notification_manager.notify_many(recipients=recipients, event=event, actor=actor, object=object,
+                                            target=target, details=details)
+
+
+async def anotify(recipient, event, actor=None, object=None, target=None, details=''):
+    return await notification_manager.anotify(recipient=recipient, event=event, actor=actor, object=object,
+                                              target=target, details=details)
+
+
+async def anotify_many(recipients, event, actor=None, object=None, target=None, details=''):
+    return await notification_manager.anotify_many(recipients=recipients, event=event, actor=actor, object=object,
+                                                   target=target, details=details)
+
+
+def notify_in_background(recipients, event, actor=None, object=None, target=None, details=''):
+    """
+    Enqueues single lightweight job which fans out notification to recipients (queryset, instances or ids) in chunks
+    """
+    from whistle.jobs import notify_many_in_background as notify_job
+
+    kwargs = {
+        'actor': get_instance_reference(actor),
+        'object': get_instance_reference(object),
+        'target': get_instance_reference(target),
+        'details': details,
+    }
+
+    if isinstance(recipients, QuerySet):
+        # pickled query instead of evaluated queryset
+        return notify_job.delay(event, recipient_query=recipients.query, **kwargs)
+
+    recipient_ids = [getattr(recipient, 'pk', recipient) for recipient in recipients]
+    return notify_job.delay(event, recipient_ids=recipient_ids, **kwargs)
+
+
+def get_instance_reference(instance):
+    if instance is None:
+        return None
+
+    return ContentType.objects.get_for_model(instance).pk, instance.pk
+
+
+def get_referenced_instance(reference):
+    if reference is None:
+        return None
+
+    content_type_id, pk = reference
+    return ContentType.objects.get_for_id(content_type_id).get_object_for_this_type(pk=pk)
+
+
+def chunks(iterable, size):
+    chunk = []
+
+    for item in iterable:
+        chunk.append(item)
+
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+# named placeholders of any printf conversion type, e.g. %(object)s or %(count)d
+PLACEHOLDERS_PATTERN = re.compile(r'%\((\w+)\)[#0\- +]*\d*(?:\.\d+)?[diouxXeEfFgGcrsa]')
+MULTIPLE_SPACES_PATTERN = re.compile(' +')
+
+
 def strip_unwanted_chars(str):
-    pat = re.compile(r'%\(.*\)s|"%\(.*\)s"|%\(.*\)r|"%\(.*\)r"')
-    str = re.sub(pat, '', gettext(str))  # remove all variable placeholders
+    str = PLACEHOLDERS_PATTERN.sub('', gettext(str))  # remove all variable placeholders
+    return clean_description(str.replace('%%', '%'))
+
+
+def clean_description(str):
     str = str.replace("''", '')  # remove all 2 single quotas
     str = str.replace('""', '')  # remove all 2 double quotas
     str = str.replace('()', '')  # remove empty braces
     str = str.strip(' :.')  # remove trailing spaces and semicolons
-    str = re.sub(' +', ' ', str)  # remove all multiple spaces
+    str = MULTIPLE_SPACES_PATTERN.sub(' ', str)  # remove all multiple spaces
     return str
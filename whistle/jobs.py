@@ -1,14 +1,60 @@
 from django_rq import job
+from django.contrib.auth import get_user_model
 from django.core.mail import send_mail
 from whistle import settings as whistle_settings
 
 
 @job(whistle_settings.REDIS_QUEUE)
 def notify_in_background(recipient, event, actor=None, object=None, target=None, details=''):
+    from whistle.helpers import notify
     notify(recipient=recipient, event=event, actor=actor, object=object, target=target, details=details)
 
 
+@job(whistle_settings.REDIS_QUEUE)
+def notify_many_in_background(event, recipient_ids=None, recipient_query=None, actor=None, object=None, target=None, details=''):
+    """
+    Splits recipients into chunks notified by separate jobs. Actor, object and target are (content type id, pk) references.
+    """
+    from whistle.helpers import chunks
+
+    if recipient_query is not None:
+        recipients = get_user_model()._default_manager.all()
+        recipients.query = recipient_query
+        recipient_ids = recipients.order_by('pk').values_list('pk', flat=True).iterator()
+
+    for chunk in chunks(recipient_ids, whistle_settings.BATCH_SIZE):
+        notify_chunk_in_background.delay(event, chunk, actor=actor, object=object, target=target, details=details)
+
+
+@job(whistle_settings.REDIS_QUEUE)
+def notify_chunk_in_background(event, recipient_ids, actor=None, object=None, target=None, details=''):
+    from whistle.helpers import get_referenced_instance
+    from whistle.settings import notification_manager
+
+    return len(notification_manager.notify_many(
+        recipients=get_user_model()._default_manager.filter(pk__in=recipient_ids),
+        event=event,
+        actor=get_referenced_instance(actor),
+        object=get_referenced_instance(object),
+        target=get_referenced_instance(target),
+        details=details
+    ))
+
+
 @job(whistle_settings.REDIS_QUEUE)
 def send_mail_in_background(subject, message, from_email, recipient_list, html_message=None, fail_silently=True):
     send_mail(subject=subject, message=message, from_email=from_email, recipient_list=recipient_list,
               html_message=html_message, fail_silently=fail_silently)
+
+
+@job(whistle_settings.REDIS_QUEUE)
+def send_mails_in_background(messages):
+    from whistle.settings import email_manager
+    failures = email_manager.deliver_mails(messages)
+    return [(message['recipient_list'], str(e)) for message, e in failures]
+
+
+@job(whistle_settings.REDIS_QUEUE)
+def send_digests_in_background(window=None):
+    from whistle.settings import notification_manager
+    return notification_manager.send_digests(window=window)
@@ -0,0 +1,9 @@
+from whistle.management.commands.delete_old_notifications import Command as DeleteOldNotificationsCommand
+
+
+class Command(DeleteOldNotificationsCommand):
+    help = 'Moves old notifications based by threshold settings into archive.'
+    action = 'archived'
+
+    def process_chunk(self, notifications):
+        return notifications.archive()
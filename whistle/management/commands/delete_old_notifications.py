@@ -1,3 +1,6 @@
+import time
+
+from django.contrib.auth import get_user_model
 from django.core.management import BaseCommand
 
 from whistle.models import Notification
@@ -6,6 +9,7 @@ from whistle import settings as whistle_settings
 
 class Command(BaseCommand):
     help = 'Deletes old notifications based by threshold settings.'
+    action = 'deleted'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -13,19 +17,77 @@ class Command(BaseCommand):
             action='store_true',
             help="Don't delete notifications, just outputs the number of old notifications.",
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=whistle_settings.BATCH_SIZE,
+            help='Number of notifications deleted in one chunk.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Seconds to wait between chunks.',
+        )
+        parser.add_argument(
+            '--max-seconds',
+            type=float,
+            default=None,
+            help='Stop after this number of seconds, next run continues where this one stopped.',
+        )
 
     def handle(self, *args, **options):
         threshold = whistle_settings.OLD_THRESHOLD
         print(f'Old threshold (age): {threshold}')
 
         if threshold is None:
-            exit('Threshold is not set. Not deleting any notifications.')
+            exit(f'Threshold is not set. No notifications {self.action}.')
 
         old_notifications = Notification.objects.old()
         print(f'Number of old notifications: {old_notifications.count()}')
 
         if options['dry_run']:
-            exit('Dry run. Not deleting any notifications.')
+            exit(f'Dry run. No notifications {self.action}.')
+
+        started = time.monotonic()
+        last_pk = 0
+        processed = 0
+
+        while True:
+            if options['max_seconds'] is not None and time.monotonic() - started >= options['max_seconds']:
+                print(f'Time budget exceeded. Number of {self.action} notifications: {processed}')
+                return
+
+            chunk = list(
+                old_notifications
+                .filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', 'recipient_id', 'is_read')[:options['batch_size']]
+            )
+
+            if not chunk:
+                break
+
+            processed += self.process_chunk(Notification.objects.filter(pk__in=[pk for pk, recipient_id, is_read in chunk]))
+
+            # unread notifications are cached and counted
+            self.clear_recipients_cache({recipient_id for pk, recipient_id, is_read in chunk if not is_read})
+
+            last_pk = chunk[-1][0]
+            print(f'{self.action.capitalize()} notifications: {processed}')
+
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        print(f'Old notifications {self.action}.')
+
+    def process_chunk(self, notifications):
+        return notifications.delete_chunk()
+
+    def clear_recipients_cache(self, recipient_ids):
+        if not recipient_ids:
+            return
 
-        old_notifications.delete()
-        print('Old notifications deleted.')
+        user_model = get_user_model()
+        user_model.clear_unread_notifications_cache_many(recipient_ids)
+        user_model.reset_unread_notifications_counts(recipient_ids)
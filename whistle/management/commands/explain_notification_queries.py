@@ -0,0 +1,84 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from whistle.models import Notification
+
+# plans of full table scans by database vendor
+FULL_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on'),
+    'sqlite': re.compile(r'SCAN (TABLE )?\S*notification(?! USING)'),
+    'mysql': re.compile(r'\bALL\b'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Checks by EXPLAIN that notification queryset methods use indexes.'
+
+    def get_querysets(self):
+        """
+        Returns {name: (queryset, names of expected indexes)}, any index is accepted if no names are expected
+        """
+        # unsaved instances are enough to build queries
+        recipient = get_user_model()(pk=1)
+        obj = Notification(pk=1)
+        notifications = Notification.objects.all()
+
+        recipient_indexes = ['whistle_recipient_created_idx', 'whistle_unread_idx']
+        subject_indexes = ['whistle_object_idx', 'whistle_target_idx']
+
+        return {
+            'for_recipient': (notifications.for_recipient(recipient), recipient_indexes),
+            'unread().for_recipient': (notifications.unread().for_recipient(recipient), recipient_indexes),
+            'of_object': (notifications.of_object(obj), ['whistle_object_idx']),
+            'of_target': (notifications.of_target(obj), ['whistle_target_idx']),
+            'of_object_or_target': (notifications.of_object_or_target(obj), subject_indexes),
+            'unread().for_recipient().of_object_or_target': (
+                notifications.unread().for_recipient(recipient).of_object_or_target(obj),
+                recipient_indexes + subject_indexes
+            ),
+            'old': (notifications.old(), []),
+        }
+
+    def uses_index(self, plan, index_names):
+        if index_names:
+            return any(index_name in plan for index_name in index_names)
+
+        full_scan_pattern = FULL_SCAN_PATTERNS.get(connection.vendor, None)
+
+        if full_scan_pattern is None:
+            raise CommandError(f'Database {connection.vendor} is not supported.')
+
+        return full_scan_pattern.search(plan) is None
+
+    def handle(self, *args, **options):
+        failures = []
+
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # planner prefers sequential scans of small tables, check whether indexes are usable at all
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for name, (queryset, index_names) in self.get_querysets().items():
+                if queryset.query.is_empty():
+                    print(f'{name}: skipped (empty query)')
+                    continue
+
+                plan = queryset.explain()
+
+                if self.uses_index(plan, index_names):
+                    print(f'{name}: OK')
+                else:
+                    print(f'{name}: expected index not used')
+                    failures.append(name)
+
+                if options['verbosity'] > 1:
+                    print(plan)
+
+        if failures:
+            raise CommandError(f'Queries without expected index: {", ".join(failures)}')
+
+        print('All queries use indexes.')
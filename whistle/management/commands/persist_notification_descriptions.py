@@ -0,0 +1,56 @@
+from django.core.management import BaseCommand
+from django.db.models import Q
+
+from whistle.models import Notification
+
+
+class Command(BaseCommand):
+    help = 'Renders and stores descriptions of existing notifications in all configured languages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of notifications processed in one chunk.',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rerender descriptions of notifications which already have them.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        notifications = Notification.objects.order_by('pk')
+
+        if not options['all']:
+            # SQL NULL or JSON null
+            notifications = notifications.filter(Q(descriptions__isnull=True) | Q(descriptions=None))
+
+        print(f'Number of notifications to process: {notifications.count()}')
+
+        last_pk = 0
+        processed = 0
+
+        while True:
+            chunk = list(
+                notifications
+                .filter(pk__gt=last_pk)
+                .select_related('actor')
+                .prefetch_subjects()[:batch_size]
+            )
+
+            if not chunk:
+                break
+
+            for notification in chunk:
+                notification.descriptions = notification.render_descriptions()
+
+            Notification.objects.bulk_update(chunk, ['descriptions'])
+
+            last_pk = chunk[-1].pk
+            processed += len(chunk)
+            print(f'Processed notifications: {processed}')
+
+        print('Descriptions persisted.')
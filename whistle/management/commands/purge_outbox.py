@@ -0,0 +1,82 @@
+import time
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+from django.utils.timezone import now
+
+from whistle.models import OutboxItem
+from whistle import settings as whistle_settings
+
+
+class Command(BaseCommand):
+    help = 'Deletes delivered outbox items, they are kept only for inspection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=float,
+            default=None,
+            help='Delete items delivered more than this number of seconds ago (default: WHISTLE_OLD_THRESHOLD).',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Don't delete outbox items, just outputs the number of delivered items.",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=whistle_settings.BATCH_SIZE,
+            help='Number of outbox items deleted in one chunk.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Seconds to wait between chunks.',
+        )
+        parser.add_argument(
+            '--max-seconds',
+            type=float,
+            default=None,
+            help='Stop after this number of seconds, next run continues where this one stopped.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        threshold = whistle_settings.OLD_THRESHOLD
+
+        if options['older_than'] is not None:
+            threshold = timedelta(seconds=options['older_than'])
+
+        print(f'Old threshold (age): {threshold}')
+
+        if threshold is None:
+            exit('Threshold is not set. No outbox items deleted.')
+
+        # items are delivered right after they are claimed
+        done_items = OutboxItem.objects.filter(status=OutboxItem.STATUS_DONE, claimed_at__lt=now() - threshold)
+        print(f'Number of delivered outbox items: {done_items.count()}')
+
+        if options['dry_run']:
+            exit('Dry run. No outbox items deleted.')
+
+        deleted = 0
+
+        while True:
+            if options['max_seconds'] is not None and time.monotonic() - started >= options['max_seconds']:
+                print(f'Time budget exceeded. Number of deleted outbox items: {deleted}')
+                return
+
+            pks = list(done_items.order_by('pk').values_list('pk', flat=True)[:options['batch_size']])
+
+            if not pks:
+                break
+
+            deleted += OutboxItem.objects.filter(pk__in=pks).delete()[0]
+            print(f'Deleted outbox items: {deleted}')
+
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        print('Delivered outbox items deleted.')
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+
+from whistle.settings import notification_manager
+
+
+class Command(BaseCommand):
+    help = 'Sends email digests of buffered notifications.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window',
+            type=int,
+            default=None,
+            help='Send digest only to recipients whose oldest buffered notification is older than window (minutes).',
+        )
+
+    def handle(self, *args, **options):
+        window = timedelta(minutes=options['window']) if options['window'] is not None else None
+        sent = notification_manager.send_digests(window=window)
+        print(f'Number of sent digests: {sent}')
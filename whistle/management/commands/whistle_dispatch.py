@@ -0,0 +1,70 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management import BaseCommand
+
+from whistle import settings as whistle_settings
+from whistle.dispatch import closing_connections
+from whistle.settings import notification_manager
+
+
+class Command(BaseCommand):
+    help = 'Delivers pending notifications recorded in outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=whistle_settings.BATCH_SIZE,
+            help='Number of outbox items claimed at once.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Number of worker threads claiming and delivering batches.',
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=whistle_settings.OUTBOX_STALE_AFTER,
+            help='Reclaim items claimed longer ago than this number of seconds (crashed workers).',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling outbox instead of exiting when it is empty.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1,
+            help='Seconds to wait between polls of empty outbox (with --loop).',
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(options['concurrency'], 1)
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='whistle-dispatch') as executor:
+            futures = [executor.submit(closing_connections(self.work), options) for i in range(concurrency)]
+            processed = sum(future.result() for future in futures)
+
+        print(f'Number of processed outbox items: {processed}')
+
+    def work(self, options):
+        processed = 0
+
+        while True:
+            count = notification_manager.dispatch_outbox(
+                batch_size=options['batch_size'],
+                stale_after=options['stale_after']
+            )
+            processed += count
+
+            if count:
+                continue
+
+            if not options['loop']:
+                return processed
+
+            time.sleep(options['sleep'])
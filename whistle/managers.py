@@ -1,29 +1,204 @@
 from __future__ import unicode_literals
 
+import asyncio
 import json
+import logging
+from collections import defaultdict
+from contextlib import nullcontext
+from datetime import timedelta
+from functools import partial
+
 import django.dispatch
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.sites.shortcuts import get_current_site
-from django.core.exceptions import ObjectDoesNotExist
-from django.core.mail import send_mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ObjectDoesNotExist
+from django.core.mail import send_mail, get_connection, EmailMultiAlternatives
 from django.core.validators import EMPTY_VALUES
-from django.db.models import QuerySet, Q
+from django.db import connection, connections, transaction
+from django.db.models import QuerySet, Q, Min, F, Value, SET_NULL, signals
+from django.db.models.query import ModelIterable
 from django.template import loader, TemplateDoesNotExist
 from django.utils.module_loading import import_string
 from django.utils.timezone import now
+from django.utils import translation
+from django.utils.translation import get_language, ngettext
 from pragmatic.helpers import method_overridden
 
 from whistle import settings as whistle_settings
+from whistle.channels import get_channels
+
+logger = logging.getLogger(__name__)
+
+
+def prefetch_subjects(notifications, select_related=None):
+    """
+    Fetches objects and targets of notifications with single query per content type
+    """
+    select_related = select_related or {}
+    subject_fields = []
+    subject_ids = defaultdict(set)
+
+    for notification in notifications:
+        for field_name in ['object', 'target']:
+            field = notification._meta.get_field(field_name)
+            content_type_id = getattr(notification, notification._meta.get_field(field.ct_field).get_attname())
+            object_id = getattr(notification, field.fk_field)
+            subject_fields.append((notification, field, content_type_id, object_id))
+
+            if content_type_id is not None and object_id is not None:
+                subject_ids[content_type_id].add(object_id)
+
+    subjects = {}
+
+    for content_type_id, object_ids in subject_ids.items():
+        content_type = ContentType.objects.get_for_id(content_type_id)
+        model = content_type.model_class()
+
+        if model is None:
+            # stale content type
+            continue
+
+        queryset = model._base_manager.all()
+        related = select_related.get(model, select_related.get(f'{content_type.app_label}.{content_type.model}'))
+
+        if related:
+            queryset = queryset.select_related(*related)
+
+        for pk, subject in queryset.in_bulk(object_ids).items():
+            subjects[(content_type_id, pk)] = subject
+
+    for notification, field, content_type_id, object_id in subject_fields:
+        field.set_cached_value(notification, subjects.get((content_type_id, object_id)))
+
+    return notifications
+
+
+def prefetch_descriptions(notifications, pass_variables=(True, False), urls=True):
+    """
+    Resolves descriptions and URLs of notifications with single cache lookup.
+    Only missing values are rendered and saved back into cache at once.
+    """
+    language = get_language()
+    cache_keys = {}
+
+    for notification in notifications:
+        for variables in pass_variables:
+            cache_key = notification.get_description_cache_key(variables, language)
+            persisted_description = notification.get_persisted_description(variables, language)
+
+            if persisted_description is not None:
+                notification.resolved_values[cache_key] = persisted_description
+            else:
+                cache_keys[cache_key] = (notification, variables)
+
+        if urls:
+            cache_keys[notification.get_url_cache_key(language)] = (notification, None)
+
+    saved_values = cache.get_many([
+        cache_key for cache_key, (notification, variables) in cache_keys.items() if notification.pk is not None
+    ])
+
+    missing_keys = [cache_key for cache_key in cache_keys if saved_values.get(cache_key) is None]
+
+    # render missing values using prefetched objects
+    missing_notifications = {id(cache_keys[cache_key][0]): cache_keys[cache_key][0] for cache_key in missing_keys}
+    prefetch_subjects([
+        notification for notification in missing_notifications.values()
+        if not notification._meta.get_field('object').is_cached(notification)
+    ])
+
+    new_values = {}
+
+    for cache_key in missing_keys:
+        notification, variables = cache_keys[cache_key]
+
+        try:
+            value = notification.render_url() if variables is None else notification.render_description(variables)
+        except KeyError:
+            continue
+
+        saved_values[cache_key] = value
+
+        if notification.pk is not None:
+            new_values[cache_key] = value
+
+    for cache_key, value in saved_values.items():
+        cache_keys[cache_key][0].resolved_values[cache_key] = value
+
+    if new_values:
+        cache.set_many(new_values, timeout=whistle_settings.TIMEOUT)
+
+    return notifications
 
 
 class NotificationQuerySet(QuerySet):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._prefetch_subjects = None
+        self._prefetch_descriptions = None
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._prefetch_subjects = self._prefetch_subjects
+        clone._prefetch_descriptions = self._prefetch_descriptions
+        return clone
+
+    def _fetch_all(self):
+        fetched = self._result_cache is not None
+        super()._fetch_all()
+
+        if fetched or not issubclass(self._iterable_class, ModelIterable):
+            return
+
+        if self._prefetch_subjects is not None:
+            prefetch_subjects(self._result_cache, self._prefetch_subjects)
+
+        if self._prefetch_descriptions is not None:
+            prefetch_descriptions(self._result_cache, **self._prefetch_descriptions)
+
+    def prefetch_subjects(self, select_related=None):
+        """
+        Prefetches GFK objects and targets with one query per content type.
+        Select related fields can be specified per model class or 'app_label.model' label.
+        """
+        clone = self._chain()
+        clone._prefetch_subjects = select_related or {}
+        return clone
+
+    def prefetch_descriptions(self, pass_variables=(True, False), urls=True):
+        """
+        Resolves cached descriptions and URLs of fetched notifications at once
+        """
+        clone = self._chain()
+        clone._prefetch_descriptions = {'pass_variables': pass_variables, 'urls': urls}
+        return clone
+
     def unread(self):
         return self.filter(is_read=False)
 
     def mark_as_read(self):
         return self.update(is_read=True)
 
+    def delete(self):
+        # unread notifications are cached and counted
+        recipient_ids = set(self.unread().values_list('recipient_id', flat=True))
+        deleted = super().delete()
+        self.reset_recipients_cache(recipient_ids)
+        return deleted
+
+    def reset_recipients_cache(self, recipient_ids):
+        if not recipient_ids:
+            return
+
+        user_model = self.model._meta.get_field('recipient').related_model
+        transaction.on_commit(lambda: (
+            user_model.clear_unread_notifications_cache_many(recipient_ids),
+            user_model.reset_unread_notifications_counts(recipient_ids)
+        ), using=self.db)
+
     def for_recipient(self, recipient):
         return self.filter(recipient=recipient) if recipient.is_authenticated else self.none()
 
@@ -57,35 +232,157 @@ class NotificationQuerySet(QuerySet):
 
         return self.filter(created__gte=now()-threshold)
 
+    def delete_chunk(self):
+        """
+        Deletes (already chunked) notifications by raw delete if there are no signals and cascades to collect.
+        Returns number of deleted notifications.
+        """
+        if not self.can_raw_delete():
+            return self.delete()[1].get(self.model._meta.label, 0)
+
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list('pk', flat=True))
+
+            # SET_NULL relations (digest and outbox items) are nulled by single update instead of collecting them
+            for relation in self.model._meta.related_objects:
+                relation.related_model._base_manager.using(self.db)\
+                    .filter(**{f'{relation.field.name}__in': pks})\
+                    .update(**{relation.field.name: None})
+
+            return self.model._base_manager.using(self.db).filter(pk__in=pks)._raw_delete(self.db)
+
+    def can_raw_delete(self):
+        """
+        Collector can't fast delete notifications referred by SET_NULL relations, check only signals and real cascades
+        """
+        if any(signal.has_listeners(self.model) for signal in [signals.pre_delete, signals.post_delete]):
+            return False
+
+        # generic relations cascade
+        if any(hasattr(field, 'bulk_related_objects') for field in self.model._meta.private_fields):
+            return False
+
+        return all(
+            relation.on_delete is SET_NULL and not relation.many_to_many
+            for relation in self.model._meta.related_objects
+        )
+
+    def archive(self):
+        """
+        Moves (already chunked) notifications into archive by INSERT ... SELECT and deletes them within
+        single transaction. Returns number of archived notifications.
+        """
+        from whistle.models import ArchivedNotification
+
+        fields = ArchivedNotification.get_archived_fields()
+        archived_at = Value(now(), output_field=ArchivedNotification._meta.get_field('archived'))
+        sql, params = self.order_by().values(*fields, archived_at=archived_at).query.sql_with_params()
+
+        columns = [ArchivedNotification._meta.get_field(field).column for field in fields + ['archived']]
+        insert_sql = 'INSERT INTO {} ({}) {}'.format(
+            connections[self.db].ops.quote_name(ArchivedNotification._meta.db_table),
+            ', '.join(connections[self.db].ops.quote_name(column) for column in columns),
+            sql
+        )
+
+        with transaction.atomic(using=self.db):
+            with connections[self.db].cursor() as cursor:
+                cursor.execute(insert_sql, params)
+
+            return self.delete_chunk()
+
 
 class NotificationManager(object):
     notification_emailed = django.dispatch.Signal()
     notification_pushed = django.dispatch.Signal()
 
+    PREFERENCES_CACHE_KEY = 'whistle_preferences'
+    PREFERENCES_ATTRIBUTE = '_whistle_preferences'
+
     def is_channel_available(self, user, channel):
-        return self.is_notification_available(user, channel, event=None)
+        return self.get_preferences(user).is_channel_available(channel)
 
     def is_notification_available(self, user, channel, event):
-        handler = whistle_settings.AVAILABILITY_HANDLER
+        return self.get_preferences(user).is_notification_available(channel, event)
 
-        if handler:
-            if isinstance(handler, str):
-                handler = import_string(handler)
+    def is_channel_enabled(self, user, channel):
+        return self.get_preferences(user).is_channel_enabled(channel)
 
-            channel_available = handler(user, channel, event=None)
-            event_available = handler(user, channel, event)
+    def is_notification_enabled(self, user, channel, event, bypass_channel=False):
+        return self.get_preferences(user).is_notification_enabled(channel, event, bypass_channel)
 
-            return channel_available and event_available
+    def is_digest_enabled(self, user, event):
+        return self.get_preferences(user).is_digest_enabled(event)
 
-        return channel in whistle_settings.CHANNELS
+    def get_preferences_cache_key(self, user_id):
+        return '{}_{}'.format(self.PREFERENCES_CACHE_KEY, user_id)
 
-    def is_channel_enabled(self, user, channel):
-        return self.is_notification_enabled(user, channel, event=None)
+    def get_preferences(self, user):
+        # memoized on user instance
+        preferences = getattr(user, self.PREFERENCES_ATTRIBUTE, None)
 
-    def is_notification_enabled(self, user, channel, event, bypass_channel=False):
-        # check if event is available for user
-        if not self.is_notification_available(user, channel, event):
-            return False
+        if preferences is not None:
+            return preferences
+
+        return self.get_preferences_many([user])[0]
+
+    def get_preferences_many(self, users):
+        from whistle.preferences import NotificationPreferences, get_settings_version
+
+        preferences = {}
+        settings_versions = {}
+        cache_keys = {}
+
+        for index, user in enumerate(users):
+            # memoized on user instance
+            user_preferences = getattr(user, self.PREFERENCES_ATTRIBUTE, None)
+
+            if user_preferences is not None:
+                preferences[index] = user_preferences
+            else:
+                settings_versions[index] = (get_settings_version(user.notification_settings), self.get_availability_version(user))
+
+                if user.pk:
+                    cache_keys[index] = self.get_preferences_cache_key(user.pk)
+
+        saved_preferences = cache.get_many(cache_keys.values()) if cache_keys else {}
+        missing_users = {}
+
+        for index in settings_versions.keys():
+            saved_user_preferences = saved_preferences.get(cache_keys.get(index))
+
+            if saved_user_preferences is not None and saved_user_preferences[0] == settings_versions[index]:
+                preferences[index] = NotificationPreferences.deserialize(saved_user_preferences[1])
+            else:
+                missing_users[index] = users[index]
+
+        if missing_users:
+            availability_map = self.get_availability_map(list(missing_users.values()))
+            new_preferences = {}
+
+            for index, user in missing_users.items():
+                preferences[index] = self.compile_preferences(user, availability_map.get(user.pk, {}))
+
+                if index in cache_keys:
+                    new_preferences[cache_keys[index]] = (settings_versions[index], preferences[index].serialize())
+
+            if new_preferences:
+                # availability may change without any notice, compiled preferences expire on their own
+                cache.set_many(new_preferences, timeout=whistle_settings.PREFERENCES_CACHE_TIMEOUT)
+
+        for index, user in enumerate(users):
+            setattr(user, self.PREFERENCES_ATTRIBUTE, preferences[index])
+
+        return [preferences[index] for index in range(len(users))]
+
+    def clear_preferences_cache(self, user):
+        if hasattr(user, self.PREFERENCES_ATTRIBUTE):
+            delattr(user, self.PREFERENCES_ATTRIBUTE)
+
+        cache.delete(self.get_preferences_cache_key(user.pk))
+
+    def compile_preferences(self, user, availability):
+        from whistle.preferences import NotificationPreferences
 
         notification_settings = user.notification_settings
 
@@ -93,6 +390,95 @@ class NotificationManager(object):
         if isinstance(notification_settings, str):
             notification_settings = json.loads(notification_settings)
 
+        channels = {}
+        events = {}
+
+        for channel in whistle_settings.CHANNELS:
+            channel_available = availability.get((channel, None), False)
+            channels[channel] = (
+                channel_available,
+                self.get_notification_setting(notification_settings, channel, event=None)
+            )
+            events[channel] = {}
+
+            for event, label in whistle_settings.EVENTS:
+                event_available = channel_available and availability.get((channel, event), False)
+                events[channel][event] = (
+                    event_available,
+                    self.get_notification_setting(notification_settings, channel, event)
+                )
+
+        digests = {
+            event: self.get_digest_setting(notification_settings, event)
+            for event, label in whistle_settings.EVENTS
+        }
+
+        return NotificationPreferences(channels, events, digests)
+
+    def get_availability_handler(self):
+        handler = whistle_settings.AVAILABILITY_HANDLER
+
+        if isinstance(handler, str):
+            handler = import_string(handler)
+
+        return handler
+
+    def get_availability_version(self, user):
+        """
+        Returns version of user availability provided by optional handler.version(user) callable,
+        cached preferences are recompiled whenever it changes
+        """
+        version = getattr(self.get_availability_handler(), 'version', None)
+        return version(user) if version is not None else None
+
+    def get_availability_map(self, users):
+        """
+        Returns {user.pk: {(channel, event): available}} for all channels and events. Channel availability
+        is stored under (channel, None).
+        """
+        handler = self.get_availability_handler()
+        channels = list(whistle_settings.CHANNELS)
+        events = [event for event, label in whistle_settings.EVENTS]
+
+        # batch protocol: single call for all users, channels and events
+        batch_handler = getattr(handler, 'batch', None)
+
+        if batch_handler is not None:
+            return batch_handler(users, channels, events)
+
+        availability_map = {}
+
+        for user in users:
+            availability = availability_map[user.pk] = {}
+
+            for channel in channels:
+                availability[(channel, None)] = self.get_availability(user, channel, event=None, handler=handler)
+
+                if not availability[(channel, None)]:
+                    continue
+
+                for event in events:
+                    availability[(channel, event)] = self.get_availability(user, channel, event, handler=handler)
+
+        return availability_map
+
+    def get_availability(self, user, channel, event, handler=None):
+        handler = handler or self.get_availability_handler()
+
+        if handler:
+            return handler(user, channel, event)
+
+        return channel in whistle_settings.CHANNELS
+
+    def get_digest_setting(self, notification_settings, event):
+        try:
+            # user digest setting
+            return notification_settings['digests'][event.lower()]
+        except (KeyError, TypeError):
+            # events delivered by digest by default
+            return event in whistle_settings.DIGEST_EVENTS
+
+    def get_notification_setting(self, notification_settings, channel, event):
         # checking channel settings (event is empty)
         if event is None:
             try:
@@ -102,10 +488,6 @@ class NotificationManager(object):
                 # channel enabled by default
                 return True
 
-        # checking channel settings at first (higher priority)
-        if not self.is_channel_enabled(user, channel) and not bypass_channel:
-            return False
-
         event_identifier = event.lower()
 
         try:
@@ -132,33 +514,715 @@ class NotificationManager(object):
             details=details
         )
 
-        # web
-        if self.is_notification_enabled(recipient, 'web', event):
-            # save notification to DB
-            notification.save()
+        deliveries = {}
+        outbox = {}
+
+        with self.outbox_atomic():
+            for name, channel in get_channels().items():
+                if not self.is_notification_enabled(recipient, name, event):
+                    continue
+
+                if channel.dispatch_first:
+                    # web notification has to be saved at first, other channels refer to it
+                    channel.send(notification)
+                elif not self.limit_notifications(name, [notification]):
+                    continue
+                elif whistle_settings.USE_OUTBOX:
+                    outbox[name] = [notification]
+                else:
+                    deliveries[name] = partial(channel.send, notification)
+
+            # recorded within the same transaction as notification
+            self.enqueue_notifications(outbox)
+
+        self.dispatch_channels(deliveries)
+
+    def outbox_atomic(self):
+        """
+        Outbox items have to be recorded within the same transaction as notifications
+        """
+        return transaction.atomic() if whistle_settings.USE_OUTBOX else nullcontext()
+
+    def save_notification(self, notification):
+        if not self.coalesce_notifications([notification]):
+            return
+
+        if whistle_settings.PERSIST_DESCRIPTIONS:
+            notification.descriptions = notification.render_descriptions()
+
+        # save notification to DB
+        notification.save()
+
+        # clear user notifications cache, not before the notification is visible to other processes
+        recipient = notification.recipient
+        transaction.on_commit(lambda: (
+            recipient.clear_unread_notifications_cache(),
+            recipient.incr_unread_notifications_count()
+        ))
+
+    def notify_email(self, notification):
+        notification.send_mail()
+        self.notification_emailed.send(
+            sender=self.__class__, notification=notification,
+        )
+
+    def notify_push(self, notification):
+        notification.push()
+        self.notification_pushed.send(
+            sender=self.__class__, notification=notification,
+        )
+
+    def notify_many(self, recipients, event, actor=None, object=None, target=None, details=''):
+        if isinstance(recipients, QuerySet):
+            recipients = recipients.filter(is_active=True)
+
+        recipients = [recipient for recipient in recipients if recipient.is_active]
+
+        if not recipients:
+            return []
+
+        channel_notifications = self.prepare_notifications(recipients, event, actor, object, target, details)
+        self.deliver_notifications(channel_notifications)
+        return channel_notifications.get('web', [])
+
+    def deliver_notifications(self, channel_notifications):
+        """
+        Delivers {channel: notifications} by batch channel paths or records them to outbox
+        """
+        channels = get_channels()
+        deliveries = {}
+        outbox = {}
+
+        with self.outbox_atomic():
+            for name, notifications in channel_notifications.items():
+                if not notifications:
+                    continue
+
+                if channels[name].dispatch_first:
+                    # web notifications have to be saved at first, other channels refer to them
+                    channels[name].send_batch(notifications)
+                    continue
+
+                notifications = self.limit_notifications(name, notifications)
+
+                if not notifications:
+                    continue
+
+                if whistle_settings.USE_OUTBOX:
+                    outbox[name] = notifications
+                else:
+                    deliveries[name] = partial(channels[name].send_batch, notifications)
+
+            # recorded within the same transaction as notifications
+            self.enqueue_notifications(outbox)
+
+        self.dispatch_channels(deliveries)
+
+    def enqueue_notifications(self, channel_notifications, **kwargs):
+        """
+        Records pending deliveries {channel: notifications} to outbox
+        """
+        from whistle.models import OutboxItem
+
+        OutboxItem.objects.bulk_create([
+            OutboxItem.from_notification(notification, channel=channel, **kwargs)
+            for channel, notifications in channel_notifications.items()
+            for notification in notifications
+        ], batch_size=whistle_settings.BATCH_SIZE)
+
+    def claim_outbox_items(self, batch_size, stale_after=None):
+        """
+        Claims batch of pending outbox items (and items of stale claims) and returns them
+        """
+        from whistle.models import OutboxItem
 
-            # clear user notifications cache
-            recipient.clear_unread_notifications_cache()
+        stale_after = whistle_settings.OUTBOX_STALE_AFTER if stale_after is None else stale_after
+        claimed_at = now()
+        claimable = Q(status=OutboxItem.STATUS_PENDING, available_at__lte=claimed_at) | \
+            Q(status=OutboxItem.STATUS_CLAIMED, claimed_at__lt=claimed_at - timedelta(seconds=stale_after))
 
-        # email
-        if self.is_notification_enabled(recipient, 'email', event):
-            notification.send_mail()
-            self.notification_emailed.send(
-                sender=self.__class__, notification=notification,
+        with transaction.atomic():
+            items = OutboxItem.objects.filter(claimable).order_by('available_at', 'pk')
+
+            if connection.features.has_select_for_update_skip_locked:
+                # concurrent workers skip rows claimed by each other
+                items = items.select_for_update(skip_locked=True)
+
+            item_ids = list(items.values_list('pk', flat=True)[:batch_size])
+
+            # claimable condition guards against concurrent workers without skip locked support
+            OutboxItem.objects\
+                .filter(claimable, pk__in=item_ids)\
+                .update(status=OutboxItem.STATUS_CLAIMED, claimed_at=claimed_at, attempts=F('attempts') + 1)
+
+        items = list(
+            OutboxItem.objects
+            .filter(pk__in=item_ids, status=OutboxItem.STATUS_CLAIMED, claimed_at=claimed_at)
+            .select_related('recipient', 'actor', 'notification')
+        )
+        prefetch_subjects(items)
+        return items
+
+    def dispatch_outbox(self, batch_size=None, stale_after=None):
+        """
+        Claims batch of outbox items, delivers them by batch channel paths and returns number of processed items
+        """
+        from whistle.models import OutboxItem
+
+        items = self.claim_outbox_items(batch_size or whistle_settings.BATCH_SIZE, stale_after)
+        channels = get_channels()
+        channel_items = defaultdict(list)
+
+        for item in items:
+            channel_items[item.channel].append(item)
+
+        for name, items_of_channel in channel_items.items():
+            item_ids = [item.pk for item in items_of_channel]
+            notifications = [item.build_notification() for item in items_of_channel]
+
+            # notification objects are unsaved for non web channels, map them by identity
+            notification_items = {id(notification): item for notification, item in zip(notifications, items_of_channel)}
+
+            try:
+                failures = channels[name].send_batch(notifications)
+            except Exception as e:
+                logger.exception('Failed to dispatch %s outbox items', name)
+                self.retry_outbox_items(item_ids, repr(e))
+                continue
+
+            failed_ids = set()
+
+            # only items of failed notifications are retried
+            for notification, error in failures or []:
+                item = notification_items[id(notification)]
+                failed_ids.add(item.pk)
+                self.retry_outbox_items([item.pk], repr(error))
+
+            OutboxItem.objects.filter(pk__in=set(item_ids) - failed_ids).update(status=OutboxItem.STATUS_DONE, last_error='')
+
+        return len(items)
+
+    def retry_outbox_items(self, item_ids, error):
+        from whistle.models import OutboxItem
+
+        items = OutboxItem.objects.filter(pk__in=item_ids)
+
+        # give up after max attempts
+        items.filter(attempts__gte=whistle_settings.OUTBOX_MAX_ATTEMPTS)\
+            .update(status=OutboxItem.STATUS_FAILED, last_error=error)
+
+        for attempts in set(items.filter(status=OutboxItem.STATUS_CLAIMED).values_list('attempts', flat=True)):
+            items.filter(status=OutboxItem.STATUS_CLAIMED, attempts=attempts).update(
+                status=OutboxItem.STATUS_PENDING,
+                last_error=error,
+                available_at=now() + timedelta(seconds=whistle_settings.OUTBOX_RETRY_DELAY * attempts)
             )
 
-        # push
-        if self.is_notification_enabled(recipient, 'push', event):
-            notification.push()
-            self.notification_pushed.send(
-                sender=self.__class__, notification=notification,
+    def prepare_notifications(self, recipients, event, actor=None, object=None, target=None, details=''):
+        """
+        Creates new notification objects and splits them by enabled channels
+        """
+        from whistle.models import Notification
+
+        notifications = [
+            Notification(
+                recipient=recipient,
+                event=event,
+                actor=actor,
+                object=object,
+                target=target,
+                details=details
+            ) for recipient in recipients
+        ]
+
+        # resolve channel opt-ins for the whole recipient set at once
+        self.get_preferences_many(recipients)
+        channel_notifications = self.get_channel_notifications(notifications, event)
+        web_notifications = channel_notifications.get('web', [])
+
+        if web_notifications and whistle_settings.PERSIST_DESCRIPTIONS:
+            # descriptions don't depend on recipient, render them just once
+            descriptions = web_notifications[0].render_descriptions()
+
+            for notification in web_notifications:
+                notification.descriptions = descriptions
+
+        return channel_notifications
+
+    def save_notifications(self, notifications):
+        from whistle.models import Notification
+
+        notifications = self.coalesce_notifications(notifications)
+
+        if not notifications:
+            return
+
+        # save notifications to DB
+        if self.can_bulk_create():
+            Notification.objects.bulk_create(notifications, batch_size=whistle_settings.BATCH_SIZE)
+        else:
+            with transaction.atomic():
+                for notification in notifications:
+                    notification.save()
+
+        # clear user notifications cache, not before notifications are visible to other processes
+        recipient_ids = [notification.recipient_id for notification in notifications]
+        user_model = notifications[0].recipient.__class__
+        transaction.on_commit(lambda: (
+            user_model.clear_unread_notifications_cache_many(recipient_ids),
+            user_model.update_unread_notifications_counts({recipient_id: 1 for recipient_id in recipient_ids})
+        ))
+
+    def can_bulk_create(self):
+        """
+        Other channels refer to saved notifications, bulk create sets their primary keys only if database
+        returns them (not MySQL / MariaDB)
+        """
+        from whistle.models import Notification
+
+        return connections[Notification.objects.db].features.can_return_rows_from_bulk_insert
+
+    def coalesce_notifications(self, notifications):
+        """
+        Merges new notifications (of the same event, object and target, actor may differ) into recent unread
+        notifications of their recipients if event is coalesced, the latest actor is kept.
+        Returns notifications which have to be created.
+        """
+        from whistle.models import Notification
+
+        if not notifications:
+            return notifications
+
+        sample = notifications[0]
+        window = whistle_settings.COALESCE_EVENTS.get(sample.event, None)
+
+        if window is None:
+            return notifications
+
+        recipient_notifications = {notification.recipient_id: notification for notification in notifications}
+
+        # ordered by created, so the latest notification of each recipient wins
+        existing = {
+            recipient_id: (pk, count, created) for recipient_id, pk, count, created in Notification.objects
+            .unread()
+            .filter(
+                recipient_id__in=recipient_notifications.keys(),
+                event=sample.event,
+                object_content_type_id=sample.object_content_type_id,
+                object_id=sample.object_id,
+                target_content_type_id=sample.target_content_type_id,
+                target_id=sample.target_id,
+                created__gte=now() - timedelta(seconds=window)
+            )
+            .order_by('recipient_id', 'created')
+            .values_list('recipient_id', 'pk', 'count', 'created')
+        }
+
+        if not existing:
+            return notifications
+
+        modified = now()
+        rows_updated = Notification.objects\
+            .unread()\
+            .filter(pk__in=[pk for pk, count, created in existing.values()])\
+            .update(count=F('count') + 1, actor=sample.actor, modified=modified)
+
+        if rows_updated < len(existing):
+            # some of notifications were read in the meantime, new ones will be created instead
+            updated_ids = set(
+                Notification.objects
+                .filter(recipient_id__in=existing.keys(), modified=modified)
+                .values_list('recipient_id', flat=True)
+            )
+            existing = {recipient_id: values for recipient_id, values in existing.items() if recipient_id in updated_ids}
+
+        coalesced = []
+
+        for recipient_id, (pk, count, created) in existing.items():
+            notification = recipient_notifications[recipient_id]
+            notification.pk = pk
+            notification.count = count + 1
+            notification.created = created
+            notification.modified = modified
+            notification.coalesced = True
+            notification._state.adding = False
+            notification._state.db = Notification.objects.db
+            coalesced.append(notification)
+
+        if coalesced:
+            self.refresh_coalesced_notifications(coalesced)
+
+        return [notification for notification in notifications if not getattr(notification, 'coalesced', False)]
+
+    def refresh_coalesced_notifications(self, notifications):
+        """
+        Refreshes descriptions of coalesced notifications, they depend on actor and count
+        """
+        from whistle.models import Notification
+
+        # descriptions are cached under active language (e.g. en-us), which doesn't have to be configured
+        languages = set(whistle_settings.LANGUAGES) | {get_language() or settings.LANGUAGE_CODE, settings.LANGUAGE_CODE}
+
+        description_keys = [
+            notification.get_description_cache_key(pass_variables, language)
+            for notification in notifications
+            for language in languages
+            for pass_variables in [True, False]
+        ]
+
+        if whistle_settings.PERSIST_DESCRIPTIONS:
+            # descriptions don't depend on recipient, render them once per count
+            count_descriptions = {}
+
+            for notification in notifications:
+                if notification.count not in count_descriptions:
+                    count_descriptions[notification.count] = notification.render_descriptions()
+
+                notification.descriptions = count_descriptions[notification.count]
+
+            Notification.objects.bulk_update(notifications, ['descriptions'], batch_size=whistle_settings.BATCH_SIZE)
+
+        # unread notifications list changed, but number of them didn't
+        recipient_ids = [notification.recipient_id for notification in notifications]
+        user_model = notifications[0].recipient.__class__
+        transaction.on_commit(lambda: (
+            cache.delete_many(description_keys),
+            user_model.clear_unread_notifications_cache_many(recipient_ids)
+        ))
+
+    def get_throttle_cache_key(self, channel, notification_id):
+        return 'whistle_throttle_{}_{}'.format(channel, notification_id)
+
+    def throttle_notifications(self, channel, notifications):
+        """
+        Filters out repeated deliveries of coalesced notifications. Deliveries are suppressed completely
+        or limited to one per WHISTLE_COALESCE_THROTTLE seconds.
+        """
+        throttle = whistle_settings.COALESCE_THROTTLE
+        allowed_notifications = []
+        throttled_keys = {}
+
+        for notification in notifications:
+            if not getattr(notification, 'coalesced', False):
+                allowed_notifications.append(notification)
+
+                if throttle is not None and notification.pk and notification.event in whistle_settings.COALESCE_EVENTS:
+                    # first delivery starts throttle interval
+                    throttled_keys[self.get_throttle_cache_key(channel, notification.pk)] = True
+            elif throttle is not None and cache.add(self.get_throttle_cache_key(channel, notification.pk), True, timeout=throttle):
+                allowed_notifications.append(notification)
+
+        if throttled_keys:
+            cache.set_many(throttled_keys, timeout=throttle)
+
+        return allowed_notifications
+
+    def limit_channel_notifications(self, channel_notifications):
+        return {
+            channel: self.limit_notifications(channel, notifications)
+            for channel, notifications in channel_notifications.items()
+        }
+
+    def limit_notifications(self, channel, notifications):
+        """
+        Returns notifications which can be delivered by channel right now
+        """
+        return self.rate_limit_notifications(channel, self.throttle_notifications(channel, notifications))
+
+    def rate_limit_notifications(self, channel, notifications):
+        """
+        Takes deliveries from rate limit buckets of recipients (WHISTLE_RATE_LIMITS), handles over limit
+        notifications by policy and returns the rest
+        """
+        from whistle.ratelimit import get_rate_limit
+
+        if not notifications:
+            return notifications
+
+        rate_limit = get_rate_limit(channel, notifications[0].event)
+
+        if rate_limit is None:
+            return notifications
+
+        allowed = rate_limit.consume([notification.recipient_id for notification in notifications])
+        limited_notifications = [notification for notification, ok in zip(notifications, allowed) if not ok]
+
+        if limited_notifications:
+            self.handle_rate_limited(channel, limited_notifications, rate_limit)
+
+        return [notification for notification, ok in zip(notifications, allowed) if ok]
+
+    def handle_rate_limited(self, channel, notifications, rate_limit):
+        from whistle.ratelimit import POLICY_DIGEST, POLICY_DEFER, POLICY_DROP, count_suppressed
+
+        policy = rate_limit.policy
+
+        if policy == POLICY_DIGEST and channel == 'email':
+            # deliver later within email digest
+            self.digest_notifications(notifications)
+        elif policy == POLICY_DEFER:
+            # deliver by outbox worker when rate limit window ends
+            available_at = now() + timedelta(seconds=rate_limit.get_retry_after())
+            self.enqueue_notifications({channel: notifications}, available_at=available_at)
+        else:
+            policy = POLICY_DROP
+
+        count_suppressed(channel, policy, len(notifications))
+
+    def email_notifications(self, notifications):
+        digest_notifications = []
+        mail_notifications = []
+
+        for notification in notifications:
+            if self.is_digest_enabled(notification.recipient, notification.event):
+                digest_notifications.append(notification)
+            else:
+                mail_notifications.append(notification)
+
+        self.digest_notifications(digest_notifications)
+        return self.mail_notifications(mail_notifications)
+
+    async def anotify(self, recipient, event, actor=None, object=None, target=None, details=''):
+        return await self.anotify_many([recipient], event, actor, object, target, details)
+
+    async def anotify_many(self, recipients, event, actor=None, object=None, target=None, details=''):
+        if django.VERSION < (4, 2):
+            # async ORM (asave, abulk_create) and cache APIs
+            raise ImproperlyConfigured('Async notifications require Django 4.2 or newer.')
+
+        if isinstance(recipients, QuerySet):
+            recipients = [recipient async for recipient in recipients.filter(is_active=True)]
+
+        recipients = [recipient for recipient in recipients if recipient.is_active]
+
+        if not recipients:
+            return []
+
+        channel_notifications = await sync_to_async(self.prepare_notifications)(
+            recipients, event, actor, object, target, details
+        )
+
+        if whistle_settings.USE_OUTBOX:
+            # web notifications and outbox items are saved in the same transaction
+            await sync_to_async(self.deliver_notifications)(channel_notifications)
+            return channel_notifications.get('web', [])
+
+        channels = get_channels()
+
+        # web notifications have to be saved at first, other channels refer to them
+        for name, notifications in channel_notifications.items():
+            if notifications and channels[name].dispatch_first:
+                await channels[name].asend_batch(notifications)
+
+        # rest of channels concurrently (limiting may buffer notifications to digest or outbox)
+        deliveries = await sync_to_async(self.limit_channel_notifications)({
+            name: notifications
+            for name, notifications in channel_notifications.items()
+            if notifications and not channels[name].dispatch_first
+        })
+        await asyncio.gather(*[
+            channels[name].asend_batch(notifications)
+            for name, notifications in deliveries.items()
+            if notifications
+        ])
+
+        return channel_notifications.get('web', [])
+
+    async def asave_notifications(self, notifications):
+        from whistle.models import Notification
+
+        if notifications and notifications[0].event in whistle_settings.COALESCE_EVENTS:
+            notifications = await sync_to_async(self.coalesce_notifications)(notifications)
+
+        if not notifications:
+            return
+
+        # save notifications to DB
+        if len(notifications) > 1 and self.can_bulk_create():
+            await Notification.objects.abulk_create(notifications, batch_size=whistle_settings.BATCH_SIZE)
+        else:
+            for notification in notifications:
+                await notification.asave()
+
+        # clear user notifications cache
+        recipient_ids = [notification.recipient_id for notification in notifications]
+        user_model = notifications[0].recipient.__class__
+        await user_model.aclear_unread_notifications_cache_many(recipient_ids)
+        await user_model.aupdate_unread_notifications_counts({recipient_id: 1 for recipient_id in recipient_ids})
+
+    async def aemail_notifications(self, notifications):
+        if notifications:
+            await self.run_in_thread(self.email_notifications)(notifications)
+
+    async def apush_notifications(self, notifications):
+        if notifications:
+            await self.run_in_thread(self.push_notifications)(notifications)
+
+    def run_in_thread(self, func):
+        """
+        Runs blocking channel delivery outside of the main sync thread, so channels don't wait for each other
+        """
+        from whistle.dispatch import closing_connections, keeping_language
+        return sync_to_async(closing_connections(keeping_language(func)), thread_sensitive=False)
+
+    def dispatch_channels(self, channels):
+        """
+        Delivers channels {channel: callable} one after another or concurrently if WHISTLE_CONCURRENT_CHANNELS is set
+        """
+        # worker threads use their own connections and wouldn't see uncommitted notifications
+        if whistle_settings.CONCURRENT_CHANNELS and not connection.in_atomic_block:
+            from whistle.dispatch import dispatch
+            return dispatch(channels)
+
+        for deliver in channels.values():
+            deliver()
+
+    def get_channel_notifications(self, notifications, event):
+        channel_notifications = {name: [] for name in get_channels()}
+
+        for notification in notifications:
+            for channel, enabled_notifications in channel_notifications.items():
+                if self.is_notification_enabled(notification.recipient, channel, event):
+                    enabled_notifications.append(notification)
+
+        return channel_notifications
+
+    def mail_notifications(self, notifications):
+        """
+        Emails notifications in batches, returns list of (notification, exception) failures
+        """
+        from whistle.helpers import chunks
+        from whistle.settings import email_manager
+
+        failures = []
+
+        if self.is_mail_delivery_overridden():
+            # customized single message delivery can't be batched, notifications are emailed one by one
+            for notification in notifications:
+                try:
+                    self.notify_email(notification)
+                except Exception as e:
+                    logger.warning('Emailing notification %s failed: %s', notification.pk, e)
+                    failures.append((notification, e))
+
+            return failures
+
+        for chunk in chunks(notifications, whistle_settings.BATCH_SIZE):
+            messages = [self.get_mail_message(notification) for notification in chunk]
+            message_notifications = {id(message): notification for message, notification in zip(messages, chunk)}
+            failed = {}
+
+            for message, error in email_manager.send_mails(messages):
+                failed[id(message)] = error
+                failures.append((message_notifications[id(message)], error))
+
+            for message, notification in zip(messages, chunk):
+                if id(message) not in failed:
+                    self.notification_emailed.send(
+                        sender=self.__class__, notification=notification,
+                    )
+
+        return failures
+
+    def digest_notifications(self, notifications):
+        """
+        Buffers notifications to be emailed within digest
+        """
+        from whistle.models import DigestItem
+
+        DigestItem.objects.bulk_create([
+            DigestItem.from_notification(notification) for notification in notifications
+        ], batch_size=whistle_settings.BATCH_SIZE)
+
+    def send_digests(self, window=None):
+        """
+        Emails one digest per recipient with all buffered notifications. If window (timedelta) is set,
+        only recipients whose oldest buffered notification is older than window receive digest.
+        """
+        from whistle.helpers import chunks
+        from whistle.models import DigestItem
+        from whistle.settings import email_manager
+
+        pending_items = DigestItem.objects.filter(created__lte=now())
+        recipient_ids = pending_items.order_by().values('recipient_id').annotate(oldest=Min('created'))
+
+        if window is not None:
+            recipient_ids = recipient_ids.filter(oldest__lte=now() - window)
+
+        recipient_ids = list(recipient_ids.values_list('recipient_id', flat=True))
+        sent = 0
+
+        for chunk in chunks(recipient_ids, whistle_settings.EMAIL_BATCH_SIZE):
+            items = list(
+                pending_items
+                .filter(recipient_id__in=chunk)
+                .select_related('recipient', 'actor', 'notification')
+                .order_by('created')
             )
+            prefetch_subjects(items)
+
+            recipient_notifications = defaultdict(list)
+
+            for item in items:
+                recipient_notifications[item.recipient].append(item.build_notification())
+
+            message_recipients = {}
+
+            for recipient, notifications in recipient_notifications.items():
+                if recipient.is_active:
+                    message = email_manager.prepare_digest(recipient, notifications)
+                    message_recipients[id(message)] = (message, recipient)
+
+            messages = [message for message, recipient in message_recipients.values()]
+            failed_recipients = {
+                message_recipients[id(message)][1] for message, error in email_manager.send_mails(messages)
+            }
+
+            # items of failed digests are kept for next run
+            DigestItem.objects\
+                .filter(pk__in=[item.pk for item in items if item.recipient not in failed_recipients])\
+                .delete()
+
+            for message, recipient in message_recipients.values():
+                if recipient in failed_recipients:
+                    continue
+
+                for notification in recipient_notifications[recipient]:
+                    self.notification_emailed.send(
+                        sender=self.__class__, notification=notification,
+                    )
+
+            sent += len(messages) - len(failed_recipients)
+
+        return sent
+
+    def push_notifications(self, notifications):
+        """
+        Pushes notifications in batches, returns list of (notification, exception) failures
+        """
+        from whistle.helpers import chunks
+
+        failures = []
+
+        for chunk in chunks(notifications, whistle_settings.BATCH_SIZE):
+            chunk_failures = self.deliver_pushes(chunk)
+            failed = {id(notification) for notification, error in chunk_failures}
+            failures += chunk_failures
+
+            for notification in chunk:
+                if id(notification) not in failed:
+                    self.notification_pushed.send(
+                        sender=self.__class__, notification=notification,
+                    )
+
+        return failures
 
-    def get_event_context(self, event, actor, object, target):
+    def get_event_context(self, event, actor, object, target, count=1):
         event_context = {
             'actor': actor if actor else '',
             'object': object if object else '',
             'target': target if target else '',
+            'count': count,
         }
 
         if object:
@@ -171,40 +1235,62 @@ class NotificationManager(object):
 
         return event_context
 
-    def get_description(self, event, actor, object, target, pass_variables=True):
+    def get_description(self, event, actor, object, target, pass_variables=True, count=1):
+        from whistle.events import get_compiled_event
+        compiled_event = get_compiled_event(event)
+
+        if compiled_event is None:
+            raise KeyError(event)
+
+        if not pass_variables:
+            # description without variables doesn't depend on context
+            return compiled_event.short_description
+
         event_context = self.get_event_context(
             event=event,
             actor=actor,
             object=object,
-            target=target
+            target=target,
+            count=count
         )
 
-        if not pass_variables:
-            for key in event_context:
-                event_context[key] = ''
+        # format and strip unwanted or duplicated characters
+        return compiled_event.format(event_context)
 
-        event_template = dict(whistle_settings.EVENTS).get(event)
-        description = event_template % event_context
+    def get_mail_kwargs(self, notification):
+        return {
+            'recipient': notification.recipient,
+            'event': notification.event,
+            'actor': notification.actor,
+            'object': notification.object,
+            'target': notification.target,
+            'details': notification.details,
+            'count': notification.count,
+            'hash': notification.hash,
+            'url': notification.get_absolute_url()
+        }
 
-        # strip unwanted or duplicated characters
-        from whistle.helpers import strip_unwanted_chars
-        description = strip_unwanted_chars(description)
+    def get_mail_message(self, notification):
+        """
+        Prepares email message of notification, used by batch deliveries (single ones use EmailManager.send_mail)
+        """
+        from whistle.settings import email_manager
 
-        return description
+        return email_manager.prepare_message(**self.get_mail_kwargs(notification))
 
     def mail_notification(self, notification):
         from whistle.settings import email_manager
 
-        return email_manager.send_mail(
-            recipient=notification.recipient,
-            event=notification.event,
-            actor=notification.actor,
-            object=notification.object,
-            target=notification.target,
-            details=notification.details,
-            hash=notification.hash,
-            url=notification.get_absolute_url()
-        )
+        return email_manager.send_mail(**self.get_mail_kwargs(notification))
+
+    def is_mail_delivery_overridden(self):
+        """
+        Projects customizing single message delivery (older extension points) have to keep it in batch deliveries
+        """
+        from whistle.settings import email_manager
+
+        return type(self).mail_notification is not NotificationManager.mail_notification \
+            or type(email_manager).send_mail is not EmailManager.send_mail
 
     def get_push_config(self, notification):
         if notification.details not in EMPTY_VALUES:
@@ -234,74 +1320,197 @@ class NotificationManager(object):
         }
 
     def push_notification(self, notification):
+        return self.deliver_pushes([notification])
+
+    def get_push_data(self, notification):
+        data = {}
+
+        for data_attr in ['id', 'object_id', 'target_id', 'object_content_type', 'target_content_type']:
+            value = getattr(notification, data_attr)
+
+            if value:
+                data[data_attr] = '.'.join(value.natural_key()) if isinstance(value, ContentType) else str(value)
+
+        return data
+
+    def get_push_payload(self, notification, badge):
+        push_config = notification.push_config
+
+        return {
+            'title': push_config['title'],
+            'body': push_config['body'],
+            'data': self.get_push_data(notification),
+            'android': push_config['android'],
+            'apns': dict(push_config['apns'], badge=badge),
+        }
+
+    def deliver_pushes(self, notifications):
+        """
+        Pushes notifications to all active devices of their recipients, returns list of (notification, exception)
+        failures. Notification failed if pushing to any of its devices failed.
+        """
         from fcm_django.models import FCMDevice
-        from firebase_admin.messaging import Notification, Message, \
-            AndroidConfig, AndroidNotification, APNSPayload, Aps, APNSConfig
-
-        for device in notification.recipient.fcmdevice_set.filter(active=True):
-            data = {}
-            for data_attr in ['id', 'object_id', 'target_id', 'object_content_type', 'target_content_type']:
-                value = getattr(notification, data_attr)
-
-                if value:
-                    data[data_attr] = '.'.join(value.natural_key()) if isinstance(value, ContentType) else str(value)
-
-            # from objprint import op
-            # op(data)
-
-            result = device.send_message(
-                Message(
-                    notification=Notification(
-                        title=notification.push_config['title'],
-                        body=notification.push_config['body'],
-                        # image=self.push_data['image_url']"
-                    ),
-                    data=data,
-                    android=AndroidConfig(
-                        collapse_key=notification.push_config['android']['collapse_key'],
-                        priority=notification.push_config['android']['priority'],
-                        notification=AndroidNotification(
-                            click_action=notification.push_config['android']['click_action'],
-                            sound=notification.push_config['android']['sound']
-                        )
-                    ),
-                    apns=APNSConfig(
-                        payload=APNSPayload(
-                            aps=Aps(
-                                badge=notification.recipient.unread_notifications_count,
-                                category=notification.push_config['apns']['category'],
-                                sound=notification.push_config['apns']['sound']
-                            )
-                        )
-                    )
-                )
-            )
-            # op(result)
 
-            return result
+        recipient_ids = {notification.recipient_id for notification in notifications}
+        tokens = defaultdict(list)
+
+        for user_id, registration_id in FCMDevice.objects\
+                .filter(user_id__in=recipient_ids, active=True)\
+                .values_list('user_id', 'registration_id'):
+            tokens[user_id].append(registration_id)
+
+        # badge is computed once per recipient
+        badges = {}
+        messages = []
+        token_notifications = defaultdict(list)
+
+        for notification in notifications:
+            recipient_tokens = tokens.get(notification.recipient_id)
+
+            if not recipient_tokens:
+                continue
+
+            if notification.recipient_id not in badges:
+                badges[notification.recipient_id] = notification.recipient.unread_notifications_count
+
+            payload = self.get_push_payload(notification, badges[notification.recipient_id])
+            messages += [(payload, token) for token in recipient_tokens]
+
+            for token in recipient_tokens:
+                token_notifications[token].append(notification)
+
+        if not messages:
+            return []
+
+        # messages of all recipients are sent in batches
+        unregistered_tokens, token_failures = whistle_settings.push_transport.send_batch(messages)
+
+        if unregistered_tokens:
+            FCMDevice.objects.filter(registration_id__in=unregistered_tokens).update(active=False)
+
+        failures = {}
+
+        for token, error in token_failures:
+            for notification in token_notifications[token]:
+                failures.setdefault(id(notification), (notification, error))
+
+        return list(failures.values())
 
 
 class EmailManager(object):
+    def __init__(self):
+        # {(event, template type, language): (template, is_default)}
+        self.templates = {}
+
+        if settings.DEBUG:
+            # templates could be reloaded
+            from django.utils.autoreload import file_changed
+            file_changed.connect(self.clear_template_cache)
+
+    def clear_template_cache(self, **kwargs):
+        self.templates.clear()
+
+    def warm_up_templates(self):
+        """
+        Resolves email templates of all events in all languages, suitable to call at startup
+        """
+        events = [event for event, label in whistle_settings.EVENTS] + ['digest']
+
+        for language in whistle_settings.LANGUAGES:
+            with translation.override(language):
+                for event in events:
+                    for template_type in ['txt', 'html']:
+                        self.load_template(template_type, None, event)
+
     def send_mail(self, recipient, event, **kwargs):
         """
         Send email notification about a new event to its recipient
         """
+        # the same message as in batch deliveries
+        message = self.prepare_message(recipient=recipient, event=event, **kwargs)
+        args = (message['subject'], message['message'], message['from_email'], message['recipient_list'])
+
+        if whistle_settings.USE_RQ:
+            # use background task to release main thread
+            from whistle.jobs import send_mail_in_background
+            send_mail_in_background.delay(*args, html_message=message['html_message'], fail_silently=False)
+        else:
+            # send mail in main thread
+            send_mail(*args, html_message=message['html_message'], fail_silently=False)
 
+    def prepare_message(self, recipient, event, **kwargs):
         html_message, message, recipient_list, subject = self.prepare_email(
             recipient=recipient,
             event=event,
             **kwargs
         )
 
-        if whistle_settings.USE_RQ:
-            # use background task to release main thread
-            from whistle.jobs import send_mail_in_background
-            send_mail_in_background.delay(subject, message, settings.DEFAULT_FROM_EMAIL, recipient_list, html_message=html_message, fail_silently=False)
-        else:
-            # send mail in main thread
-            send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, recipient_list, html_message=html_message, fail_silently=False)
+        return {
+            'subject': subject,
+            'message': message,
+            'from_email': settings.DEFAULT_FROM_EMAIL,
+            'recipient_list': recipient_list,
+            'html_message': html_message,
+        }
+
+    def send_mails(self, messages):
+        """
+        Send prepared email messages in batches, each batch over single connection
+        """
+        from whistle.helpers import chunks
+
+        failures = []
+
+        for chunk in chunks(messages, whistle_settings.EMAIL_BATCH_SIZE):
+            if whistle_settings.USE_RQ:
+                # use background task to release main thread
+                from whistle.jobs import send_mails_in_background
+                send_mails_in_background.delay(chunk)
+            else:
+                # send mails in main thread
+                failures += self.deliver_mails(chunk)
+
+        return failures
+
+    def deliver_mails(self, messages):
+        """
+        Send prepared email messages over single connection, returns list of (message, exception) failures
+        """
+        failures = []
+
+        with get_connection(fail_silently=False) as connection:
+            for message in messages:
+                email = EmailMultiAlternatives(
+                    subject=message['subject'],
+                    body=message['message'],
+                    from_email=message['from_email'],
+                    to=message['recipient_list'],
+                    connection=connection
+                )
+
+                if message['html_message']:
+                    email.attach_alternative(message['html_message'], 'text/html')
+
+                try:
+                    connection.send_messages([email])
+                except Exception as e:
+                    # one bad address shouldn't abort whole batch
+                    logger.warning('Sending email to %s failed: %s', message['recipient_list'], e)
+                    failures.append((message, e))
+
+        return failures
 
     def load_template(self, template_type, recipient, event, **kwargs):
+        # resolution is memoized including missing templates
+        cache_key = (event.lower(), template_type, get_language())
+
+        try:
+            return self.templates[cache_key]
+        except KeyError:
+            template = self.templates[cache_key] = self.resolve_template(template_type, event)
+            return template
+
+    def resolve_template(self, template_type, event):
         try:
             # event specific template
             return (
@@ -309,6 +1518,13 @@ class EmailManager(object):
                 False
             )
         except TemplateDoesNotExist:
+            if event == 'digest':
+                # universal template of single notification can't render digest
+                return (
+                    None,
+                    None
+                )
+
             try:
                 # default universal template
                 return (
@@ -343,6 +1559,48 @@ class EmailManager(object):
 
         return html_message, message, recipient_list, subject
 
+    def prepare_digest(self, recipient, notifications):
+        from whistle.settings import notification_manager
+
+        # Load templates
+        t, _ = self.load_template("txt", recipient, 'digest')
+        t_html, _ = self.load_template("html", recipient, 'digest')
+
+        # context
+        context = self.get_digest_context(recipient, [
+            self.get_mail_context(**notification_manager.get_mail_kwargs(notification))
+            for notification in notifications
+        ])
+
+        return {
+            'subject': self.get_digest_subject(context),
+            'message': t.render(context),
+            'from_email': settings.DEFAULT_FROM_EMAIL,
+            'recipient_list': [recipient.email],
+            'html_message': t_html.render(context) if t_html else None,
+        }
+
+    def get_digest_context(self, recipient, notifications):
+        return {
+            'recipient': recipient,
+            'notifications': notifications,
+            'settings': settings,
+        }
+
+    def get_digest_subject(self, context):
+        count = len(context['notifications'])
+        subject = ngettext(
+            '%(count)d new notification',
+            '%(count)d new notifications',
+            count
+        ) % {'count': count}
+
+        try:
+            site = get_current_site(request=None)
+            return '[{}] {}'.format(site.name, subject)
+        except ObjectDoesNotExist:
+            return subject
+
     def get_mail_subject(self, context):
         try:
             site = get_current_site(request=None)
@@ -363,7 +1621,8 @@ class EmailManager(object):
             'event': event,
             'actor': actor,
             'object': object,
-            'target': target
+            'target': target,
+            'count': kwargs.get('count', 1)
         }
 
         # descriptions and subject
@@ -1,4 +1,4 @@
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import ValidationError
 from django.views.generic import DetailView
 
 from whistle import settings as whistle_settings
@@ -16,41 +16,42 @@ class ReadNotificationMiddleware:
 
             if notification_id:
                 try:
-                    notification = Notification.objects.get(pk=notification_id, is_read=False)
+                    rows_updated = Notification.objects\
+                        .unread()\
+                        .filter(pk=notification_id, recipient_id=request.user.pk)\
+                        .mark_as_read()
+                except (ValueError, ValidationError):
+                    # invalid notification id
+                    rows_updated = 0
+
+                if rows_updated:
+                    request.user.clear_unread_notifications_cache()
+                    request.user.decr_unread_notifications_count(rows_updated)
 
-                    if notification.recipient == request.user:
-                        notification.is_read = True
-                        notification.save(update_fields=['is_read'])
-                        request.user.clear_unread_notifications_cache()
-                except ObjectDoesNotExist:
-                    pass
+        return self.get_response(request)
 
-        # read notifications by context
-        response = self.get_response(request)
-        reload_response = False
+    def process_template_response(self, request, response):
+        # read notifications by context before response is rendered,
+        # so rendered template already reflects read notifications
+        if not request.user.is_authenticated:
+            return response
 
-        try:
-            context = response.context_data
-            view = context.get('view')
+        context = getattr(response, 'context_data', None) or {}
+        view = context.get('view')
 
-            if isinstance(view, DetailView):
-                # read notifications by object
-                object = context.get('object')
+        if isinstance(view, DetailView):
+            # read notifications by object
+            object = context.get('object')
 
-                unread_notifications = Notification.objects\
+            if object is not None:
+                rows_updated = Notification.objects\
                     .unread()\
                     .for_recipient(request.user)\
-                    .of_object_or_target(object)
+                    .of_object_or_target(object)\
+                    .mark_as_read()
 
-                if unread_notifications.exists():
-                    unread_notifications.update(is_read=True)
+                if rows_updated:
                     request.user.clear_unread_notifications_cache()
-                    reload_response = True
-
-        except AttributeError:
-            pass
-
-        if reload_response:
-            response = self.get_response(request)
+                    request.user.decr_unread_notifications_count(rows_updated)
 
         return response
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+try:
+    # Django 3.1
+    from django.db.models import JSONField
+except ImportError:
+    # older Django
+    from django.contrib.postgres.fields import JSONField
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('whistle', '0006_auto_20221116_1525'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='descriptions',
+            field=JSONField(blank=True, default=None, null=True, verbose_name='descriptions'),
+        ),
+    ]
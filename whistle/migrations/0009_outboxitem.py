@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('whistle', '0008_digestitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.CharField(max_length=50, verbose_name='event')),
+                ('object_id', models.PositiveIntegerField(blank=True, default=None, null=True)),
+                ('target_id', models.PositiveIntegerField(blank=True, default=None, null=True)),
+                ('details', models.TextField(blank=True, default='', verbose_name='details')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='created')),
+                ('channel', models.CharField(max_length=20, verbose_name='channel')),
+                ('status', models.CharField(choices=[('PENDING', 'pending'), ('CLAIMED', 'claimed'), ('DONE', 'done'), ('FAILED', 'failed')], default='PENDING', max_length=7, verbose_name='status')),
+                ('claimed_at', models.DateTimeField(blank=True, default=None, null=True, verbose_name='claimed at')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='attempts')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='last error')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='available at')),
+                ('actor', models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('notification', models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outbox_items', to='whistle.Notification')),
+                ('object_content_type', models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.ContentType')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_outbox_items', to=settings.AUTH_USER_MODEL)),
+                ('target_content_type', models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.ContentType')),
+            ],
+            options={
+                'verbose_name': 'outbox item',
+                'verbose_name_plural': 'outbox items',
+                'ordering': ('available_at',),
+                'indexes': [models.Index(fields=['status', 'available_at'], name='whistle_outbox_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+try:
+    # Django 3.1
+    from django.db.models import JSONField
+except ImportError:
+    # older Django
+    from django.contrib.postgres.fields import JSONField
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('whistle', '0010_notification_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('event', models.CharField(max_length=50, verbose_name='event')),
+                ('object_id', models.PositiveIntegerField(blank=True, default=None, null=True)),
+                ('target_id', models.PositiveIntegerField(blank=True, default=None, null=True)),
+                ('details', models.TextField(blank=True, default='', verbose_name='details')),
+                ('count', models.PositiveIntegerField(default=1, verbose_name='count')),
+                ('descriptions', JSONField(blank=True, default=None, null=True, verbose_name='descriptions')),
+                ('is_read', models.BooleanField(default=False, verbose_name='read')),
+                ('created', models.DateTimeField(verbose_name='created')),
+                ('modified', models.DateTimeField(verbose_name='modified')),
+                ('archived', models.DateTimeField(auto_now_add=True, verbose_name='archived')),
+                ('actor', models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('object_content_type', models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.ContentType')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_notifications', to=settings.AUTH_USER_MODEL)),
+                ('target_content_type', models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.ContentType')),
+            ],
+            options={
+                'verbose_name': 'archived notification',
+                'verbose_name_plural': 'archived notifications',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
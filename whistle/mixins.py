@@ -7,74 +7,145 @@ except ImportError:
 
 from django.core.cache import cache
 from django.db import models
+from django.utils.translation import get_language
 from whistle import settings as whistle_settings
 
 
 class UserNotificationsMixin(models.Model):
     CACHE_KEY = 'user_unread_notifications'
+    COUNT_CACHE_KEY = 'user_unread_notifications_count'
 
     notification_settings = JSONField(blank=True, null=True, default=None)
 
     class Meta:
         abstract = True
 
-    @property
-    def unread_notifications_count(self):
-        cache_key = self.CACHE_KEY
-        cache_version = self.pk
+    @classmethod
+    def get_unread_notifications_cache_key(cls, user_id):
+        return '{}_{}'.format(cls.CACHE_KEY, user_id)
 
-        try:
-            saved_unread_notifications = cache.get(cache_key, version=cache_version)
-            if saved_unread_notifications is not None:
-                # return saved_unread_notifications.count()
-                return len(saved_unread_notifications)
-        except LookupError:
-            pass
+    @classmethod
+    def clear_unread_notifications_cache_many(cls, user_ids):
+        cache.delete_many([cls.get_unread_notifications_cache_key(user_id) for user_id in user_ids])
 
-        return self.notifications.unread().count()
+    @classmethod
+    async def aclear_unread_notifications_cache_many(cls, user_ids):
+        await cache.adelete_many([cls.get_unread_notifications_cache_key(user_id) for user_id in user_ids])
 
-    @property
-    def unread_notifications(self):
-        cache_key = self.CACHE_KEY
-        cache_version = self.pk
+    @classmethod
+    def get_unread_notifications_count_cache_key(cls, user_id):
+        return '{}_{}'.format(cls.COUNT_CACHE_KEY, user_id)
+
+    @classmethod
+    def update_unread_notifications_counts(cls, deltas):
+        """
+        Atomically updates cached unread counters by {user_id: delta}
+        """
+        for user_id, delta in deltas.items():
+            if delta == 0:
+                continue
+
+            cache_key = cls.get_unread_notifications_count_cache_key(user_id)
+
+            try:
+                count = cache.incr(cache_key, delta) if delta > 0 else cache.decr(cache_key, -delta)
+            except ValueError:
+                # counter is not cached, it will be counted on next access
+                continue
+
+            if count < 0:
+                cache.delete(cache_key)
+
+    @classmethod
+    async def aupdate_unread_notifications_counts(cls, deltas):
+        for user_id, delta in deltas.items():
+            if delta == 0:
+                continue
+
+            cache_key = cls.get_unread_notifications_count_cache_key(user_id)
 
-        try:
-            saved_notifications = cache.get(cache_key, version=cache_version)
-        except LookupError:
-            # app models could change
-            saved_notifications = None
+            try:
+                count = await cache.aincr(cache_key, delta) if delta > 0 else await cache.adecr(cache_key, -delta)
+            except ValueError:
+                # counter is not cached, it will be counted on next access
+                continue
 
-        if saved_notifications is not None:
-            return saved_notifications
+            if count < 0:
+                await cache.adelete(cache_key)
 
-        unread_notifications = self.notifications.unread().select_related('actor')
+    @classmethod
+    def reset_unread_notifications_counts(cls, user_ids):
+        cache.delete_many([cls.get_unread_notifications_count_cache_key(user_id) for user_id in user_ids])
 
-        for notification in unread_notifications:
-            if notification.object:
-                notification.object_display = str(notification.object)
+    def incr_unread_notifications_count(self, delta=1):
+        self.update_unread_notifications_counts({self.pk: delta})
 
-                try:
-                    notification.object_url = notification.object.get_absolute_url()
-                except AttributeError:
-                    notification.object_url = '#'
+    def decr_unread_notifications_count(self, delta=1):
+        self.update_unread_notifications_counts({self.pk: -delta})
 
-                notification.object_model = notification.object.__class__.__name__
+    def reset_unread_notifications_count(self):
+        self.reset_unread_notifications_counts([self.pk])
 
-            if notification.target:
-                notification.target_display = str(notification.target)
+    def set_unread_notifications_count(self, count):
+        cache.set(self.get_unread_notifications_count_cache_key(self.pk), count, timeout=whistle_settings.TIMEOUT)
 
-                try:
-                    notification.target_url = notification.target.get_absolute_url()
-                except AttributeError:
-                    notification.target_url = '#'
+    def get_notifications_history(self):
+        """
+        Returns notifications of user including archived ones, newest first. Result can't be filtered further.
+        """
+        from whistle.models import ArchivedNotification
 
-                notification.target_model = notification.target.__class__.__name__
+        fields = ArchivedNotification.get_archived_fields()
+        archived_notifications = ArchivedNotification.objects.filter(recipient=self).order_by().values(*fields)
+        return self.notifications.order_by().only(*fields).union(archived_notifications, all=True).order_by('-created')
+
+    @property
+    def unread_notifications_count(self):
+        cache_key = self.get_unread_notifications_count_cache_key(self.pk)
+        count = cache.get(cache_key)
+
+        if count is not None:
+            return count
+
+        count = self.notifications.unread().count()
+
+        # do not overwrite counter updated in the meantime
+        cache.add(cache_key, count, timeout=whistle_settings.TIMEOUT)
+
+        return count
+
+    @property
+    def unread_notifications(self):
+        from whistle.records import NotificationRecord, NotificationRecordList
+
+        cache_key = self.get_unread_notifications_cache_key(self.pk)
+        language = get_language()
+        saved_notifications = cache.get(cache_key)
+
+        # (version, language, total, records)
+        if saved_notifications is not None \
+                and saved_notifications[0] == NotificationRecord.VERSION \
+                and saved_notifications[1] == language:
+            return NotificationRecordList(
+                [NotificationRecord(*values) for values in saved_notifications[3]],
+                saved_notifications[2]
+            )
+
+        total = self.unread_notifications_count
+        unread_notifications = self.notifications.unread()\
+            .select_related('actor')\
+            .prefetch_subjects()\
+            .prefetch_descriptions()[:whistle_settings.UNREAD_NOTIFICATIONS_LIMIT]
+        records = [NotificationRecord.from_notification(notification) for notification in unread_notifications]
 
         # save into cache
-        cache.set(cache_key, unread_notifications, version=cache_version, timeout=whistle_settings.TIMEOUT)
+        cache.set(
+            cache_key,
+            (NotificationRecord.VERSION, language, total, [record.to_tuple() for record in records]),
+            timeout=whistle_settings.TIMEOUT
+        )
 
-        return unread_notifications
+        return NotificationRecordList(records, total)
 
     def clear_unread_notifications_cache(self):
-        cache_key = self.CACHE_KEY
-        cache.delete(cache_key, version=self.pk)
+        cache.delete(self.get_unread_notifications_cache_key(self.pk))
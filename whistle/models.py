@@ -1,8 +1,18 @@
+try:
+    # Django 3.1
+    from django.db.models import JSONField
+except ImportError:
+    # older Django
+    from django.contrib.postgres.fields import JSONField
+
+from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.core.cache import cache
 from django.db import models
 from django.utils.module_loading import import_string
+from django.utils.timezone import now
+from django.utils import translation
 from django.utils.translation import gettext, gettext_lazy as _, get_language
 
 import urllib.parse as urlparse
@@ -32,6 +42,8 @@ class Notification(models.Model):
     target = GenericForeignKey(ct_field='target_content_type', fk_field='target_id')
 
     details = models.TextField(_('details'), blank=True, default='')
+    count = models.PositiveIntegerField(_('count'), default=1)
+    descriptions = JSONField(_('descriptions'), blank=True, null=True, default=None)
     is_read = models.BooleanField(_('read'), default=False, db_index=True)
     created = models.DateTimeField(_('created'), auto_now_add=True, db_index=True)
     modified = models.DateTimeField(_('modified'), auto_now=True)
@@ -41,10 +53,28 @@ class Notification(models.Model):
         verbose_name = _('notification')
         verbose_name_plural = _('notifications')
         ordering = ('-created',)
+        indexes = [
+            # for_recipient() ordered by created
+            models.Index(fields=['recipient', '-created'], name='whistle_recipient_created_idx'),
+            # unread() of recipient, partial index is skipped by databases which don't support it
+            models.Index(fields=['recipient', '-created'], condition=models.Q(is_read=False), name='whistle_unread_idx'),
+            # of_object(), of_target() and of_object_or_target()
+            models.Index(fields=['object_content_type', 'object_id'], name='whistle_object_idx'),
+            models.Index(fields=['target_content_type', 'target_id'], name='whistle_target_idx'),
+        ]
 
     def __str__(self):
         return self.description
 
+    def delete(self, *args, **kwargs):
+        deleted = super().delete(*args, **kwargs)
+
+        # unread notifications are cached and counted
+        if not self.is_read:
+            Notification.objects.reset_recipients_cache([self.recipient_id])
+
+        return deleted
+
     @property
     def description(self):
         return self.get_description(True)
@@ -52,49 +82,122 @@ class Notification(models.Model):
     @property
     def hash(self):
         from django.core import signing
-        protect = {'notification_id': self.pk, 'recipient_id': self.recipient.pk}
+        protect = {'notification_id': self.pk, 'recipient_id': self.recipient_id}
         return signing.dumps(protect, key=whistle_settings.SIGNING_KEY, salt=whistle_settings.SIGNING_SALT)
 
     def short_description(self):
         return self.get_description(False)
 
+    @property
+    def resolved_values(self):
+        # values resolved for this instance (possibly in bulk by prefetch_descriptions)
+        if not hasattr(self, '_resolved_values'):
+            self._resolved_values = {}
+
+        return self._resolved_values
+
+    def get_description_cache_key(self, pass_variables, language=None):
+        return 'notification_description_{}_{}_{}'.format(self.pk, language or get_language(), pass_variables)
+
+    def get_url_cache_key(self, language=None):
+        return 'notification_url_{}_{}'.format(self.pk, language or get_language())
+
+    def get_saved_value(self, cache_key):
+        saved_value = self.resolved_values.get(cache_key)
+
+        if saved_value is None and self.pk is not None:
+            saved_value = cache.get(cache_key)
+
+        return saved_value
+
+    def save_value(self, cache_key, value):
+        self.resolved_values[cache_key] = value
+
+        # unsaved notifications can't be cached
+        if self.pk is not None:
+            cache.set(cache_key, value, timeout=whistle_settings.TIMEOUT)
+
+    def get_persisted_description(self, pass_variables, language=None):
+        if not self.descriptions:
+            return None
+
+        language = language or get_language() or settings.LANGUAGE_CODE
+        descriptions = self.descriptions.get(language, self.descriptions.get(language.split('-')[0], {}))
+        return descriptions.get('long' if pass_variables else 'short')
+
     def get_description(self, pass_variables, bypass_cache=False):
-        language = get_language()
+        cache_key = self.get_description_cache_key(pass_variables)
+
+        if not bypass_cache:
+            persisted_description = self.get_persisted_description(pass_variables)
 
-        cache_key = self.__class__.__name__.lower()
-        cache_version = '{}_{}_{}'.format(self.pk, language, pass_variables)
-        saved_description = cache.get(cache_key, version=cache_version)
+            if persisted_description is not None:
+                return persisted_description
 
-        if saved_description is not None and not bypass_cache:
-            return saved_description
+            saved_description = self.get_saved_value(cache_key)
+
+            if saved_description is not None:
+                return saved_description
 
         try:
-            description = notification_manager.get_description(self.event, self.actor, self.object, self.target, pass_variables)
+            description = self.render_description(pass_variables)
         except KeyError:
             # if self.pk:
             #     self.delete()
             return gettext('Failed to retrieve description')
 
         # save into cache
-        cache.set(cache_key, description, version=cache_version, timeout=whistle_settings.TIMEOUT)
+        self.save_value(cache_key, description)
 
         return description
 
+    def render_description(self, pass_variables):
+        return notification_manager.get_description(self.event, self.actor, self.object, self.target, pass_variables,
+                                                    count=self.count)
+
+    def render_descriptions(self):
+        """
+        Renders long and short descriptions for all configured languages
+        """
+        descriptions = {}
+
+        for language in whistle_settings.LANGUAGES:
+            with translation.override(language):
+                try:
+                    descriptions[language] = {
+                        'long': self.render_description(pass_variables=True),
+                        'short': self.render_description(pass_variables=False),
+                    }
+                except KeyError:
+                    continue
+
+        return descriptions
+
     def resave_description(self):
+        if whistle_settings.PERSIST_DESCRIPTIONS and self.pk:
+            self.descriptions = self.render_descriptions()
+            self.save(update_fields=['descriptions'])
+
         return {
             'long': self.get_description(pass_variables=True, bypass_cache=True),
             'short': self.get_description(pass_variables=False, bypass_cache=True),
         }
 
     def get_absolute_url(self):
-        language = get_language()
-        cache_key = 'notification_url'
-        cache_version = '{}_{}'.format(self.pk, language)
-        saved_url = cache.get(cache_key, version=cache_version)
+        cache_key = self.get_url_cache_key()
+        saved_url = self.get_saved_value(cache_key)
 
         if saved_url is not None:
             return saved_url
 
+        url = self.render_url()
+
+        # save into cache
+        self.save_value(cache_key, url)
+
+        return url
+
+    def render_url(self):
         url = '#'
         for obj in [self.object, self.target]:
             try:
@@ -120,9 +223,6 @@ class Notification(models.Model):
             url_parts[4] = urlencode(query)
             url = urlparse.urlunparse(url_parts)
 
-        # save into cache
-        cache.set(cache_key, url, version=cache_version, timeout=whistle_settings.TIMEOUT)
-
         return url
 
     @property
@@ -140,3 +240,168 @@ class Notification(models.Model):
         return notification_manager.push_notification(
             notification=self
         )
+
+
+class NotificationPayload(models.Model):
+    """
+    Data needed to rebuild notification for later delivery
+    """
+    event = models.CharField(_('event'), max_length=50)
+    actor = models.ForeignKey(whistle_settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, related_name='+',
+        blank=True, null=True, default=None)
+
+    object_content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name='+',
+        blank=True, null=True, default=None)
+    object_id = models.PositiveIntegerField(
+        blank=True, null=True, default=None)
+    object = GenericForeignKey(ct_field='object_content_type', fk_field='object_id')
+
+    target_content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name='+',
+        blank=True, null=True, default=None)
+    target_id = models.PositiveIntegerField(
+        blank=True, null=True, default=None)
+    target = GenericForeignKey(ct_field='target_content_type', fk_field='target_id')
+
+    details = models.TextField(_('details'), blank=True, default='')
+    created = models.DateTimeField(_('created'), auto_now_add=True, db_index=True)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return '{}: {}'.format(self.recipient_id, self.event)
+
+    @classmethod
+    def from_notification(cls, notification, **kwargs):
+        return cls(
+            recipient_id=notification.recipient_id,
+            notification=notification if notification.pk else None,
+            event=notification.event,
+            actor_id=notification.actor_id,
+            object_content_type_id=notification.object_content_type_id,
+            object_id=notification.object_id,
+            target_content_type_id=notification.target_content_type_id,
+            target_id=notification.target_id,
+            details=notification.details,
+            **kwargs
+        )
+
+    def build_notification(self):
+        if self.notification_id is not None:
+            notification = self.notification
+
+            # reuse prefetched recipient
+            if self._meta.get_field('recipient').is_cached(self):
+                notification.recipient = self.recipient
+        else:
+            notification = Notification(
+                recipient=self.recipient,
+                event=self.event,
+                actor=self.actor,
+                object_content_type_id=self.object_content_type_id,
+                object_id=self.object_id,
+                target_content_type_id=self.target_content_type_id,
+                target_id=self.target_id,
+                details=self.details,
+                created=self.created
+            )
+
+        # reuse prefetched objects
+        for field_name in ['object', 'target']:
+            field = self._meta.get_field(field_name)
+
+            if field.is_cached(self):
+                notification._meta.get_field(field_name).set_cached_value(notification, field.get_cached_value(self))
+
+        return notification
+
+
+class DigestItem(NotificationPayload):
+    recipient = models.ForeignKey(whistle_settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notification_digest_items')
+    notification = models.ForeignKey(Notification, on_delete=models.SET_NULL, related_name='digest_items',
+        blank=True, null=True, default=None)
+
+    class Meta:
+        verbose_name = _('digest item')
+        verbose_name_plural = _('digest items')
+        ordering = ('created',)
+
+
+class OutboxItem(NotificationPayload):
+    STATUS_PENDING = 'PENDING'
+    STATUS_CLAIMED = 'CLAIMED'
+    STATUS_DONE = 'DONE'
+    STATUS_FAILED = 'FAILED'
+    STATUSES = (
+        (STATUS_PENDING, _('pending')),
+        (STATUS_CLAIMED, _('claimed')),
+        (STATUS_DONE, _('done')),
+        (STATUS_FAILED, _('failed')),
+    )
+
+    recipient = models.ForeignKey(whistle_settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notification_outbox_items')
+    notification = models.ForeignKey(Notification, on_delete=models.SET_NULL, related_name='outbox_items',
+        blank=True, null=True, default=None)
+    channel = models.CharField(_('channel'), max_length=20)
+    status = models.CharField(_('status'), choices=STATUSES, max_length=7, default=STATUS_PENDING)
+    claimed_at = models.DateTimeField(_('claimed at'), blank=True, null=True, default=None)
+    attempts = models.PositiveIntegerField(_('attempts'), default=0)
+    last_error = models.TextField(_('last error'), blank=True, default='')
+    available_at = models.DateTimeField(_('available at'), default=now)
+
+    class Meta:
+        verbose_name = _('outbox item')
+        verbose_name_plural = _('outbox items')
+        ordering = ('available_at',)
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='whistle_outbox_status_idx'),
+        ]
+
+    def __str__(self):
+        return '{}: {} ({})'.format(self.recipient_id, self.event, self.channel)
+
+
+class ArchivedNotification(models.Model):
+    """
+    Old notification moved out of notifications table (by archive_old_notifications command)
+    """
+    id = models.IntegerField(primary_key=True)
+    recipient = models.ForeignKey(whistle_settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_notifications')
+    event = models.CharField(_('event'), choices=whistle_settings.EVENTS, max_length=50)
+    actor = models.ForeignKey(whistle_settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, related_name='+',
+        blank=True, null=True, default=None)
+
+    object_content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name='+',
+        blank=True, null=True, default=None)
+    object_id = models.PositiveIntegerField(
+        blank=True, null=True, default=None)
+    object = GenericForeignKey(ct_field='object_content_type', fk_field='object_id')
+
+    target_content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name='+',
+        blank=True, null=True, default=None)
+    target_id = models.PositiveIntegerField(
+        blank=True, null=True, default=None)
+    target = GenericForeignKey(ct_field='target_content_type', fk_field='target_id')
+
+    details = models.TextField(_('details'), blank=True, default='')
+    count = models.PositiveIntegerField(_('count'), default=1)
+    descriptions = JSONField(_('descriptions'), blank=True, null=True, default=None)
+    is_read = models.BooleanField(_('read'), default=False)
+    created = models.DateTimeField(_('created'))
+    modified = models.DateTimeField(_('modified'))
+    archived = models.DateTimeField(_('archived'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('archived notification')
+        verbose_name_plural = _('archived notifications')
+        ordering = ('-created',)
+
+    def __str__(self):
+        return '{}: {}'.format(self.recipient_id, self.event)
+
+    @classmethod
+    def get_archived_fields(cls):
+        """
+        Names of fields copied from notification
+        """
+        return [field.attname for field in Notification._meta.concrete_fields]
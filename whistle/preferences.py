@@ -0,0 +1,80 @@
+import hashlib
+import json
+
+from whistle import settings as whistle_settings
+
+_configuration = None
+
+
+class NotificationPreferences(object):
+    """
+    Compiled channel x event matrix of effective notification preferences of a single user
+    """
+    # bump version whenever compiled structure changes
+    VERSION = 2
+
+    def __init__(self, channels, events, digests):
+        # {channel: (available, enabled)}
+        self.channels = channels
+
+        # {channel: {event: (available, enabled)}}
+        self.events = events
+
+        # {event: email digest enabled}
+        self.digests = digests
+
+    def is_channel_available(self, channel):
+        return self.channels.get(channel, (False, False))[0]
+
+    def is_channel_enabled(self, channel):
+        available, enabled = self.channels.get(channel, (False, False))
+        return available and enabled
+
+    def is_notification_available(self, channel, event):
+        if event is None:
+            return self.is_channel_available(channel)
+
+        return self.events.get(channel, {}).get(event, (False, False))[0]
+
+    def is_notification_enabled(self, channel, event, bypass_channel=False):
+        if event is None:
+            return self.is_channel_enabled(channel)
+
+        # checking channel settings at first (higher priority)
+        if not bypass_channel and not self.is_channel_enabled(channel):
+            return False
+
+        available, enabled = self.events.get(channel, {}).get(event, (False, False))
+        return available and enabled
+
+    def is_digest_enabled(self, event):
+        return self.digests.get(event, False)
+
+    def serialize(self):
+        return self.channels, self.events, self.digests
+
+    @classmethod
+    def deserialize(cls, data):
+        channels, events, digests = data
+        return cls(channels, events, digests)
+
+
+def get_settings_version(notification_settings):
+    """
+    Returns digest of user notification settings together with configured channels and events
+    """
+    global _configuration
+
+    if _configuration is None:
+        _configuration = json.dumps([
+            NotificationPreferences.VERSION,
+            list(whistle_settings.CHANNELS),
+            [str(event) for event, label in whistle_settings.EVENTS],
+            whistle_settings.DEFAULT_NOTIFICATIONS,
+            [str(event) for event in whistle_settings.DIGEST_EVENTS]
+        ], sort_keys=True, default=str)
+
+    if not isinstance(notification_settings, str):
+        notification_settings = json.dumps(notification_settings, sort_keys=True, default=str)
+
+    return hashlib.md5('{}{}'.format(_configuration, notification_settings).encode('utf-8')).hexdigest()
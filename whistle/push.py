@@ -0,0 +1,114 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PushTransport(object):
+    """
+    Delivers push payloads to device registration tokens
+    """
+    # maximum number of messages in single batch call
+    max_messages = 500
+
+    def send_batch(self, messages):
+        """
+        Sends list of (payload, token) messages and returns list of unregistered tokens
+        and list of (token, exception) failures of other (possibly temporary) errors
+        """
+        raise NotImplementedError
+
+
+class FirebaseTransport(PushTransport):
+    def get_app(self):
+        try:
+            from fcm_django.settings import FCM_DJANGO_SETTINGS
+            return FCM_DJANGO_SETTINGS.get('DEFAULT_FIREBASE_APP', None)
+        except ImportError:
+            return None
+
+    def build_message(self, payload, token):
+        from firebase_admin.messaging import Notification, Message, \
+            AndroidConfig, AndroidNotification, APNSPayload, Aps, APNSConfig
+
+        return Message(
+            token=token,
+            notification=Notification(
+                title=payload['title'],
+                body=payload['body'],
+            ),
+            data=payload['data'],
+            android=AndroidConfig(
+                collapse_key=payload['android']['collapse_key'],
+                priority=payload['android']['priority'],
+                notification=AndroidNotification(
+                    click_action=payload['android']['click_action'],
+                    sound=payload['android']['sound']
+                )
+            ),
+            apns=APNSConfig(
+                payload=APNSPayload(
+                    aps=Aps(
+                        badge=payload['apns']['badge'],
+                        category=payload['apns']['category'],
+                        sound=payload['apns']['sound']
+                    )
+                )
+            )
+        )
+
+    def send_batch(self, messages):
+        from firebase_admin import messaging
+
+        # messages of different recipients (payloads) are sent in one call,
+        # send_all is deprecated in newer firebase-admin versions
+        send = getattr(messaging, 'send_each', None) or messaging.send_all
+        app = self.get_app()
+        unregistered_tokens = []
+        failures = []
+
+        for index in range(0, len(messages), self.max_messages):
+            chunk = messages[index:index + self.max_messages]
+            response = send([self.build_message(payload, token) for payload, token in chunk], app=app)
+
+            for (payload, token), result in zip(chunk, response.responses):
+                if result.success:
+                    continue
+
+                if isinstance(result.exception, messaging.UnregisteredError):
+                    unregistered_tokens.append(token)
+                else:
+                    # quota, unavailable, internal, ... errors
+                    logger.warning('Pushing to %s failed: %s', token, result.exception)
+                    failures.append((token, result.exception))
+
+        return unregistered_tokens, failures
+
+
+class InMemoryTransport(PushTransport):
+    """
+    Transport for tests, keeps sent messages in outbox instead of sending them
+    """
+    outbox = []
+    # number of messages of each batch call
+    batches = []
+    unregistered_tokens = set()
+    # {token: exception}
+    failing_tokens = {}
+
+    def send_batch(self, messages):
+        unregistered_tokens = []
+        failures = []
+
+        for index in range(0, len(messages), self.max_messages):
+            chunk = messages[index:index + self.max_messages]
+            self.batches.append(len(chunk))
+
+            for payload, token in chunk:
+                self.outbox.append({'payload': payload, 'token': token})
+
+                if token in self.unregistered_tokens:
+                    unregistered_tokens.append(token)
+                elif token in self.failing_tokens:
+                    failures.append((token, self.failing_tokens[token]))
+
+        return unregistered_tokens, failures
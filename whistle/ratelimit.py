@@ -0,0 +1,121 @@
+import time
+
+from django.core.cache import cache
+
+from whistle import settings as whistle_settings
+
+POLICY_DROP = 'drop'
+POLICY_DIGEST = 'digest'
+POLICY_DEFER = 'defer'
+POLICIES = [POLICY_DROP, POLICY_DIGEST, POLICY_DEFER]
+
+SUPPRESSED_CACHE_KEY = 'whistle_rate_suppressed'
+
+
+class RateLimit(object):
+    """
+    Limit of deliveries per recipient and channel (and optionally event) within period. Buckets are fixed
+    windows of period seconds counted in cache by atomic incr, so limit can't be exceeded by concurrent processes.
+    """
+    def __init__(self, channel, limit, period, policy=POLICY_DROP, event=None):
+        if policy not in POLICIES:
+            raise ValueError(f'Unknown rate limit policy {policy}, choose one of {POLICIES}')
+
+        self.channel = channel
+        self.limit = limit
+        self.period = period
+        self.policy = policy
+        self.event = event
+
+    def get_window(self):
+        return int(time.time() // self.period)
+
+    def get_retry_after(self):
+        """
+        Returns number of seconds until current window ends
+        """
+        return (self.get_window() + 1) * self.period - time.time()
+
+    def get_cache_key(self, recipient_id, window):
+        return 'whistle_rate_{}_{}_{}_{}'.format(self.channel, self.event or '', recipient_id, window)
+
+    def consume(self, recipient_ids):
+        """
+        Takes one delivery of each recipient from their buckets, returns list of flags whether delivery is allowed
+        """
+        window = self.get_window()
+        keys = [self.get_cache_key(recipient_id, window) for recipient_id in recipient_ids]
+
+        # recipients over limit are known without incrementing their buckets
+        counts = cache.get_many(set(keys))
+        allowed = []
+
+        for key in keys:
+            if counts.get(key, 0) >= self.limit:
+                allowed.append(False)
+                continue
+
+            if key not in counts:
+                # bucket expires with its window
+                cache.add(key, 0, timeout=self.period)
+
+            try:
+                count = counts[key] = cache.incr(key)
+            except ValueError:
+                # bucket expired in the meantime
+                cache.add(key, 1, timeout=self.period)
+                count = counts[key] = 1
+
+            allowed.append(count <= self.limit)
+
+        return allowed
+
+
+def get_rate_limit(channel, event):
+    """
+    Returns rate limit of channel and event, rule of (channel, event) takes precedence over rule of channel
+    """
+    rules = whistle_settings.RATE_LIMITS
+
+    if (channel, event) in rules:
+        return RateLimit(channel, event=event, **rules[(channel, event)])
+
+    if channel in rules:
+        return RateLimit(channel, **rules[channel])
+
+    return None
+
+
+def get_suppressed_cache_key(channel, policy):
+    return '{}_{}_{}'.format(SUPPRESSED_CACHE_KEY, channel, policy)
+
+
+def count_suppressed(channel, policy, count):
+    cache_key = get_suppressed_cache_key(channel, policy)
+    cache.add(cache_key, 0, timeout=None)
+
+    try:
+        cache.incr(cache_key, count)
+    except ValueError:
+        cache.set(cache_key, count, timeout=None)
+
+
+def get_suppressed_counts():
+    """
+    Returns numbers of rate limited deliveries {(channel, policy): count}
+    """
+    keys = {
+        get_suppressed_cache_key(channel, policy): (channel, policy)
+        for channel in whistle_settings.CHANNELS
+        for policy in POLICIES
+    }
+
+    return {keys[key]: count for key, count in cache.get_many(keys.keys()).items()}
+
+
+def reset_suppressed_counts():
+    cache.delete_many([
+        get_suppressed_cache_key(channel, policy)
+        for channel in whistle_settings.CHANNELS
+        for policy in POLICIES
+    ])
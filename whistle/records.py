@@ -0,0 +1,67 @@
+class NotificationRecord(object):
+    """
+    Lightweight representation of an unread notification suitable for caching
+    """
+    # bump version whenever fields change, cached records of other version are ignored
+    VERSION = 1
+
+    __slots__ = (
+        'id', 'event', 'description', 'short_description', 'url', 'details', 'actor', 'created',
+        'object_display', 'object_url', 'object_model', 'target_display', 'target_url', 'target_model'
+    )
+
+    is_read = False
+
+    def __init__(self, *values):
+        for field, value in zip(self.__slots__, values):
+            setattr(self, field, value)
+
+    def __str__(self):
+        return self.description
+
+    @property
+    def pk(self):
+        return self.id
+
+    def get_absolute_url(self):
+        return self.url
+
+    def to_tuple(self):
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    @classmethod
+    def from_notification(cls, notification):
+        subjects = []
+
+        for subject in [notification.object, notification.target]:
+            if subject is None:
+                subjects += [None, None, None]
+                continue
+
+            try:
+                url = subject.get_absolute_url()
+            except AttributeError:
+                url = '#'
+
+            subjects += [str(subject), url, subject.__class__.__name__]
+
+        return cls(
+            notification.id,
+            notification.event,
+            notification.description,
+            notification.short_description(),
+            notification.get_absolute_url(),
+            notification.details,
+            str(notification.actor) if notification.actor else '',
+            notification.created,
+            *subjects
+        )
+
+
+class NotificationRecordList(list):
+    """
+    List of top unread notification records together with total number of unread notifications
+    """
+    def __init__(self, records, total):
+        super().__init__(records)
+        self.total = total
@@ -5,10 +5,21 @@ from django.utils.module_loading import import_string
 
 EVENTS = getattr(settings, 'WHISTLE_NOTIFICATION_EVENTS', [])
 CHANNELS = getattr(settings, 'WHISTLE_CHANNELS', ['web', 'email'])
+CHANNEL_BACKENDS = {
+    'web': 'whistle.channels.WebChannel',
+    'email': 'whistle.channels.EmailChannel',
+    'push': 'whistle.channels.PushChannel',
+    **getattr(settings, 'WHISTLE_CHANNEL_BACKENDS', {})
+}
 AVAILABILITY_HANDLER = getattr(settings, 'WHISTLE_AVAILABILITY_HANDLER', None)
 URL_HANDLER = getattr(settings, 'WHISTLE_URL_HANDLER', None)
 URL_PARAM = getattr(settings, 'WHISTLE_URL_PARAM', 'read-notification')
 TIMEOUT = getattr(settings, 'WHISTLE_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+PREFERENCES_CACHE_TIMEOUT = getattr(settings, 'WHISTLE_PREFERENCES_CACHE_TIMEOUT', 600)
+# languages of descriptions, Django default LANGUAGES lists about 100 of them
+LANGUAGES = getattr(settings, 'WHISTLE_LANGUAGES', [
+    language for language, name in settings.LANGUAGES
+] if settings.is_overridden('LANGUAGES') else [settings.LANGUAGE_CODE])
 USE_RQ = getattr(settings, 'WHISTLE_USE_RQ', True)
 REDIS_QUEUE = getattr(settings, 'WHISTLE_REDIS_QUEUE', 'default')
 SIGNING_KEY = getattr(settings, 'WHISTLE_SIGNING_KEY', settings.SECRET_KEY)
@@ -16,12 +27,30 @@ SIGNING_SALT = getattr(settings, 'WHISTLE_SIGNING_SALT', 'whistle')
 AUTH_USER_MODEL = getattr(settings, 'WHISTLE_AUTH_USER_MODEL', settings.AUTH_USER_MODEL)
 OLD_THRESHOLD = getattr(settings, 'WHISTLE_OLD_THRESHOLD', None)
 DEFAULT_NOTIFICATIONS = getattr(settings, 'WHISTLE_DEFAULT_NOTIFICATIONS', {})
+BATCH_SIZE = getattr(settings, 'WHISTLE_BATCH_SIZE', 500)
+EMAIL_BATCH_SIZE = getattr(settings, 'WHISTLE_EMAIL_BATCH_SIZE', 100)
+UNREAD_NOTIFICATIONS_LIMIT = getattr(settings, 'WHISTLE_UNREAD_NOTIFICATIONS_LIMIT', 50)
+PERSIST_DESCRIPTIONS = getattr(settings, 'WHISTLE_PERSIST_DESCRIPTIONS', False)
+DIGEST_EVENTS = getattr(settings, 'WHISTLE_DIGEST_EVENTS', [])
+COALESCE_EVENTS = getattr(settings, 'WHISTLE_COALESCE_EVENTS', {})  # {event: window in seconds}
+COALESCE_THROTTLE = getattr(settings, 'WHISTLE_COALESCE_THROTTLE', None)  # seconds, None suppresses repeats
+RATE_LIMITS = getattr(settings, 'WHISTLE_RATE_LIMITS', {})  # {channel or (channel, event): {limit, period, policy}}
+CONCURRENT_CHANNELS = getattr(settings, 'WHISTLE_CONCURRENT_CHANNELS', False)
+CONCURRENT_CHANNELS_THREADS = getattr(settings, 'WHISTLE_CONCURRENT_CHANNELS_THREADS', 4)
+CHANNEL_TIMEOUTS = getattr(settings, 'WHISTLE_CHANNEL_TIMEOUTS', {})
+FIRE_AND_FORGET_CHANNELS = getattr(settings, 'WHISTLE_FIRE_AND_FORGET_CHANNELS', [])
+USE_OUTBOX = getattr(settings, 'WHISTLE_USE_OUTBOX', False)
+OUTBOX_MAX_ATTEMPTS = getattr(settings, 'WHISTLE_OUTBOX_MAX_ATTEMPTS', 5)
+OUTBOX_RETRY_DELAY = getattr(settings, 'WHISTLE_OUTBOX_RETRY_DELAY', 60)  # seconds, multiplied by attempts
+OUTBOX_STALE_AFTER = getattr(settings, 'WHISTLE_OUTBOX_STALE_AFTER', 300)  # seconds
 
 if 'push' in CHANNELS and 'fcm_django' not in settings.INSTALLED_APPS:
     raise ValueError('fcm_django is required for push notifications. Either install the app or remove push channel from whistle channels')
 
 NOTIFICATION_MANAGER_CLASS = getattr(settings, 'WHISTLE_NOTIFICATION_MANAGER_CLASS', 'whistle.managers.NotificationManager')
 EMAIL_MANAGER_CLASS = getattr(settings, 'WHISTLE_EMAIL_MANAGER_CLASS', 'whistle.managers.EmailManager')
+PUSH_TRANSPORT_CLASS = getattr(settings, 'WHISTLE_PUSH_TRANSPORT_CLASS', 'whistle.push.FirebaseTransport')
 
 notification_manager = import_string(NOTIFICATION_MANAGER_CLASS)()
 email_manager = import_string(EMAIL_MANAGER_CLASS)()
+push_transport = import_string(PUSH_TRANSPORT_CLASS)()
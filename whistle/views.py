@@ -1,7 +1,6 @@
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.exceptions import ObjectDoesNotExist
 from django.core.signing import BadSignature
 from django.http import HttpResponse
 from django.urls import reverse_lazy
@@ -22,10 +21,14 @@ class NotificationListView(LoginRequiredMixin, ListView):
         if request.user.is_authenticated:
             request.user.notifications.unread().mark_as_read()
             request.user.clear_unread_notifications_cache()
+            # all notifications are read, including those not counted yet
+            request.user.set_unread_notifications_count(0)
         return super(NotificationListView, self).dispatch(request, *args, **kwargs)
 
     def get_queryset(self):
-        return self.request.user.notifications.select_related('actor', 'recipient')
+        return self.request.user.notifications.select_related('actor', 'recipient')\
+            .prefetch_subjects()\
+            .prefetch_descriptions(pass_variables=(True,))
 
 
 class NotificationSettingsView(LoginRequiredMixin, FormView):
@@ -40,6 +43,7 @@ class NotificationSettingsView(LoginRequiredMixin, FormView):
         user = self.get_user()
         user.notification_settings = form.cleaned_data
         user.save(update_fields=['notification_settings'])
+        settings.notification_manager.clear_preferences_cache(user)
         messages.success(self.request, _('Notification settings successfully updated'))
         return super(NotificationSettingsView, self).form_valid(form)
 
@@ -63,22 +67,24 @@ class ReadNotificationByHashView(View):
         notification_id = notification_data.get('notification_id', None)
         recipient_id = notification_data.get('recipient_id', None)
 
-        try:
-            notification = Notification.objects.get(pk=notification_id)
+        rows_updated = Notification.objects\
+            .unread()\
+            .filter(pk=notification_id, recipient_id=recipient_id)\
+            .mark_as_read()
 
-            if notification.is_read:
-                return HttpResponse('ALREADY READ')
+        if not rows_updated:
+            notification = Notification.objects.filter(pk=notification_id).values('recipient_id', 'is_read').first()
 
-            user = get_user_model().objects.get(pk=recipient_id)
+            if notification is None:
+                return HttpResponse('NOT FOUND')
 
-            if notification.recipient != user:
-                return HttpResponse('INVALID RECIPIENT')
+            if notification['is_read']:
+                return HttpResponse('ALREADY READ')
 
-            notification.is_read = True
-            notification.save(update_fields=['is_read'])
-            user.clear_unread_notifications_cache()
+            return HttpResponse('INVALID RECIPIENT')
 
-        except ObjectDoesNotExist:
-            return HttpResponse('NOT FOUND')
+        user_model = get_user_model()
+        user_model.clear_unread_notifications_cache_many([recipient_id])
+        user_model.update_unread_notifications_counts({recipient_id: -rows_updated})
 
         return HttpResponse('OK')